@@ -1,22 +1,62 @@
-from flask import Flask, request, session
+from flask import Flask, request, session, g
 import os
+import time
+import logging
 from dotenv import load_dotenv
-from routes import main_bp, admin_bp, api_bp
 
 load_dotenv()
 
+from config import Config
+from log_config import setup_logging
+setup_logging(Config.LOG_LEVEL)
+
+from routes import main_bp, admin_bp, api_bp
+import simple_sqlite as db
+from profiling import ProfilingMiddleware, get_template_time
+import metrics
+
+request_logger = logging.getLogger('movienight.requests')
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    db.reset_query_stats()
+
+@app.after_request
+def log_request(response):
+    queries, db_seconds = db.get_query_stats()
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    request_logger.info('%s %s %s %.1fms queries=%d db=%.1fms tpl=%.1fms', request.method, request.path,
+                        response.status_code, elapsed * 1000, queries, db_seconds * 1000,
+                        get_template_time() * 1000)
+    metrics.observe_request(request.endpoint, request.method, response.status_code, elapsed)
+    return response
+
+# Server-Timing breakdown and on-demand cProfile capture
+ProfilingMiddleware.init_app(app)
+
 # Register blueprints
 app.register_blueprint(main_bp)
 app.register_blueprint(admin_bp)
 app.register_blueprint(api_bp)
 
 # Initialize SQLite database
-import simple_sqlite as db
 db.init_database()
 
+# Share metrics with sibling worker processes when METRICS_DIR is set
+metrics.registry.start_flusher()
+
+# Reload unexpired seat holds so they keep expiring after a restart
+from seat_holds import holds
+holds.load()
+
+# Periodically recount occupancy counters and repair drift
+from occupancy import reconciler
+reconciler.start()
+
 if __name__ == '__main__':
     print("\n" + "="*50)
     print("🎬 MovieNight - Movie Booking System")
@@ -0,0 +1,250 @@
+"""Micro-benchmarks for the data-access layer and page templates.
+
+Usage:
+    python benchmarks.py run --output bench.json
+    python benchmarks.py run --datasets small,medium --iterations 200
+    python benchmarks.py compare baseline.json bench.json --threshold 0.15
+
+``run`` times the ``simple_sqlite`` readers and writers and the Jinja
+render of the main pages against each dataset size. Every dataset is a
+``generate_dataset`` database built once under ``--data-dir`` and copied
+before each run, and each dataset is benchmarked in its own process so the
+connection pool and caches start cold. ``compare`` exits with 1 when any benchmark's
+median is slower than the baseline by more than ``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import generate_dataset
+
+DATASETS = ('small', 'medium', 'large')
+DEFAULT_ITERATIONS = 100
+DEFAULT_THRESHOLD = 0.2
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'iterations': len(samples),
+        'min_ms': round(samples[0] * 1000, 4),
+        'median_ms': round(statistics.median(samples) * 1000, 4),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4),
+        'ops_per_sec': round(len(samples) / sum(samples), 1) if sum(samples) else 0.0,
+    }
+
+def measure(func, setup=None, iterations=DEFAULT_ITERATIONS, warmup=3):
+    """Time ``func(*setup())``; setup runs before every call and is not timed."""
+    samples = []
+    for i in range(warmup + iterations):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+def run_benchmarks(iterations, seed=42):
+    """Benchmark the module-level ``simple_sqlite`` functions against SQLITE_PATH."""
+    import simple_sqlite as db
+    from app import app
+    from flask import template_rendered
+    from controllers import MovieController, BookingController, FoodController
+
+    rng = random.Random(seed)
+    with db.get_connection() as conn:
+        show_ids = [r[0] for r in conn.execute('SELECT id FROM shows')]
+        booking_ids = [r[0] for r in conn.execute('SELECT id FROM bookings ORDER BY id DESC LIMIT 10000')]
+        busiest_movie = conn.execute('SELECT movie_id FROM shows GROUP BY movie_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()[0]
+
+    def cold(*args):
+        # Time the SQL path, not a catalog cache hit
+        return lambda: db.catalog.clear() or args
+
+    def pick(ids):
+        return lambda: (rng.choice(ids),)
+
+    def free_pairs(count):
+        # Pairs of free seats to book, found before the clock starts
+        pairs = []
+        for show_id in show_ids:
+            seat_map = db.get_booked_seats(show_id)
+            free = [seat_map.label(i) for i in range(seat_map.capacity) if seat_map.label(i) not in seat_map]
+            pairs.extend((show_id, free[i:i + 2]) for i in range(0, len(free) - 1, 2))
+            if len(pairs) >= count:
+                return iter(pairs)
+        return iter(pairs)
+
+    bookable = free_pairs(iterations + 3)
+
+    def next_booking():
+        show_id, seats = next(bookable)
+        return (show_id, 'Bench', 'bench@example.com', '0000000000', seats, 500.0)
+
+    results = {}
+    results['get_all_movies'] = measure(db.get_all_movies, cold(), iterations)
+    results['get_all_movies[cached]'] = measure(db.get_all_movies, None, iterations)
+    results['get_all_shows'] = measure(db.get_all_shows, cold(), max(5, iterations // 10))
+    results['get_show_by_id'] = measure(db.get_show_by_id, pick(show_ids), iterations)
+    results['get_booked_seats'] = measure(db.get_booked_seats, pick(show_ids), iterations)
+    results['get_booking_by_id'] = measure(db.get_booking_by_id, pick(booking_ids or [1]), iterations)
+    results['get_shows_by_movie'] = measure(db.get_shows_by_movie, cold(busiest_movie), iterations)
+    results['add_booking'] = measure(db.add_booking, next_booking, iterations)
+    results['add_food_order'] = measure(db.add_food_order,
+                                        lambda: (rng.choice(booking_ids or [1]), {'1': 2, '3': 1}, 450.0),
+                                        iterations)
+
+    # Capture each page's template and context once, then time only the render
+    pages = {
+        'render:home.html': ('/', MovieController.index, ()),
+        'render:movie_details.html': (f'/movie/{busiest_movie}', MovieController.details, (busiest_movie,)),
+        'render:book_seats.html': (f'/book_seats/{show_ids[0]}', BookingController.book_seats, (show_ids[0],)),
+        'render:food_menu.html': ('/food-menu', FoodController.food_menu, ()),
+    }
+    for name, (path, view, args) in pages.items():
+        captured = []
+
+        def capture(sender, template, context, **extra):
+            captured.append((template, context))
+
+        with app.test_request_context(path):
+            with template_rendered.connected_to(capture, app):
+                view(*args)
+            if not captured:
+                continue
+            template, context = captured[0]
+            results[name] = measure(template.render, lambda: (context,), iterations)
+    return results
+
+def _dataset_path(data_dir, name):
+    return os.path.join(data_dir, f'bench_{name}.db')
+
+def ensure_dataset(data_dir, name):
+    path = _dataset_path(data_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f'Building {name} dataset...', file=sys.stderr)
+        started = time.perf_counter()
+        partial = path + '.partial'
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate_dataset.generate(partial, **generate_dataset.SCALES[name])
+        os.replace(partial, path)
+        print(f'Built {name} dataset in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    return path
+
+def run_dataset(name, data_dir, iterations):
+    """Benchmark one dataset in a fresh process on a scratch copy of its database."""
+    source = ensure_dataset(data_dir, name)
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = os.path.join(scratch, os.path.basename(source))
+        shutil.copyfile(source, db_path)
+        env = dict(os.environ, SQLITE_PATH=db_path, LOG_LEVEL='WARNING',
+                   CATALOG_CACHE_TTL=os.environ.get('CATALOG_CACHE_TTL', '60'))
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '_worker', '--iterations', str(iterations)],
+                              env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f'Benchmarks failed on {name} dataset:\n{proc.stderr}')
+    return json.loads(proc.stdout)
+
+def run(args):
+    names = [n.strip() for n in args.datasets.split(',') if n.strip()]
+    unknown = [n for n in names if n not in DATASETS]
+    if unknown:
+        raise SystemExit(f"Unknown dataset: {', '.join(unknown)}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'iterations': args.iterations,
+        'results': {},
+    }
+    for name in names:
+        report['results'][name] = run_dataset(name, args.data_dir, args.iterations)
+        for bench, r in report['results'][name].items():
+            print(f"{name:<8}{bench:<30}{r['median_ms']:>10.3f} ms  p95 {r['p95_ms']:>9.3f} ms  {r['ops_per_sec']:>10.1f}/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+    return 0
+
+def compare(baseline, current, threshold):
+    """Rows of (dataset, benchmark, baseline_ms, current_ms, change, status)."""
+    rows = []
+    for dataset, benches in current['results'].items():
+        for bench, r in benches.items():
+            base = baseline['results'].get(dataset, {}).get(bench)
+            if base is None:
+                rows.append((dataset, bench, None, r['median_ms'], None, 'new'))
+                continue
+            change = (r['median_ms'] - base['median_ms']) / base['median_ms'] if base['median_ms'] else 0.0
+            if change > threshold:
+                status = 'REGRESSED'
+            elif change < -threshold:
+                status = 'improved'
+            else:
+                status = 'ok'
+            rows.append((dataset, bench, base['median_ms'], r['median_ms'], change, status))
+    return rows
+
+def run_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for dataset, bench, base, now, change, status in rows:
+        base_text = '-' if base is None else f'{base:.3f}'
+        change_text = '' if change is None else f'{change:+.1%}'
+        print(f'{dataset:<8}{bench:<30}{base_text:>10} -> {now:>10.3f} ms {change_text:>8}  {status}')
+    regressed = [r for r in rows if r[5] == 'REGRESSED']
+    if regressed:
+        print(f'{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}')
+        return 1
+    print(f'No regressions beyond {args.threshold:.0%}')
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data-access layer and templates.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='run benchmarks and write JSON results')
+    run_parser.add_argument('--datasets', default=','.join(DATASETS))
+    run_parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    run_parser.add_argument('--data-dir', default='.bench', help='where built datasets are kept')
+    run_parser.add_argument('--output', help='results file')
+
+    compare_parser = sub.add_parser('compare', help='compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='allowed slowdown of the median, as a fraction')
+
+    worker_parser = sub.add_parser('_worker')
+    worker_parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'compare':
+        return run_compare(args)
+    json.dump(run_benchmarks(args.iterations), sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import threading
+from contextlib import contextmanager
+from config import Config
+
+class BookingBusyError(Exception):
+    def __init__(self, show_id, timeout):
+        self.show_id = show_id
+        self.timeout = timeout
+        super().__init__('This show is very busy right now, please try again in a moment')
+
+class ShowLockManager:
+    """Serializes seat changes per show with a fixed set of lock partitions.
+
+    A show always maps to the same partition, so concurrent bookings for one
+    show queue up here instead of racing inside SQLite, while other shows
+    (almost always on other partitions) go ahead in parallel. Waiting is
+    bounded: past ``timeout`` the caller gets BookingBusyError.
+
+    ``admit`` is the same bounded wait for the group-commit writer, which
+    serializes writes itself: up to ``limit`` writes per show may be in
+    flight at once, and further callers wait for a slot.
+    """
+
+    def __init__(self, partitions=None, timeout=None):
+        self.partitions = partitions or Config.BOOKING_LOCK_PARTITIONS
+        self.timeout = Config.BOOKING_LOCK_TIMEOUT if timeout is None else timeout
+        self._locks = [threading.Lock() for _ in range(self.partitions)]
+        self._slots = [threading.Condition() for _ in range(self.partitions)]
+        self._pending = {}
+        self.timeouts = 0
+
+    def _partition(self, show_id):
+        return self._locks[hash(int(show_id)) % self.partitions]
+
+    @contextmanager
+    def lock(self, show_id, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        lock = self._partition(show_id)
+        if not lock.acquire(timeout=timeout):
+            self.timeouts += 1
+            raise BookingBusyError(show_id, timeout)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    @contextmanager
+    def admit(self, show_id, limit, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        show_id = int(show_id)
+        slots = self._slots[hash(show_id) % self.partitions]
+        with slots:
+            if not slots.wait_for(lambda: self._pending.get(show_id, 0) < limit, timeout):
+                self.timeouts += 1
+                raise BookingBusyError(show_id, timeout)
+            self._pending[show_id] = self._pending.get(show_id, 0) + 1
+        try:
+            yield
+        finally:
+            with slots:
+                self._pending[show_id] -= 1
+                if not self._pending[show_id]:
+                    del self._pending[show_id]
+                slots.notify_all()
+
+show_locks = ShowLockManager()
@@ -0,0 +1,162 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class WriteTimeoutError(Exception):
+    """A queued write was not confirmed in time.
+
+    ``applied`` is False when the write was cancelled before it ran, and
+    None when it was already committing and its outcome is unknown.
+    """
+
+    def __init__(self, applied):
+        self.applied = applied
+        if applied is False:
+            message = 'The booking service is busy and nothing was saved, please try again'
+        else:
+            message = 'We could not confirm your booking in time, please check your bookings before retrying'
+        super().__init__(message)
+
+class GroupCommitWriter:
+    """Single writer thread that commits booking writes in batches.
+
+    Request threads ``submit`` a callable taking a connection and get a
+    Future back. The writer drains up to ``max_batch`` pending writes
+    (waiting at most ``linger_ms`` for stragglers), runs each inside its
+    own SAVEPOINT so a failing write (e.g. a seat conflict) is rolled back
+    alone, commits the batch once, and then resolves every Future with the
+    callable's return value or exception. SQLITE_BUSY on BEGIN or COMMIT
+    is retried with exponential backoff.
+    """
+
+    def __init__(self, connect, max_batch=None, linger_ms=None, max_retries=None):
+        self.connect = connect
+        self.max_batch = max_batch or Config.BOOKING_WRITER_MAX_BATCH
+        self.linger = (Config.BOOKING_WRITER_LINGER_MS if linger_ms is None else linger_ms) / 1000.0
+        self.max_retries = Config.BOOKING_WRITER_MAX_RETRIES if max_retries is None else max_retries
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.busy_retries = 0
+        self.cancelled = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            # Re-check: also covers a forked worker that inherited a dead thread handle
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='booking-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, apply):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((apply, future))
+        return future
+
+    def run(self, apply, timeout):
+        """Submit ``apply`` and wait for its result.
+
+        A write still queued after ``timeout`` is cancelled, so it never
+        commits behind the caller's back. One the writer has already
+        started gets another ``timeout`` to finish before its outcome is
+        reported as unknown. Both raise WriteTimeoutError.
+        """
+        future = self.submit(apply)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                self.cancelled += 1
+                raise WriteTimeoutError(applied=False)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise WriteTimeoutError(applied=None)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logger.exception('Group commit of %d writes failed', len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit_batch(self, batch):
+        # Skip writes whose caller timed out; the rest can no longer be cancelled
+        batch = [(apply, future) for apply, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        delay = 0.01
+        for attempt in range(self.max_retries + 1):
+            try:
+                results = self._apply_batch(batch)
+                break
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e) or attempt == self.max_retries:
+                    raise
+                self.busy_retries += 1
+                logger.warning('Database busy, retrying batch of %d in %.0fms', len(batch), delay * 1000)
+                time.sleep(delay)
+                delay *= 2
+
+        self.batches += 1
+        self.writes += len(batch)
+        # Only hand results back once they are durable
+        for (_, future), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply_batch(self, batch):
+        results = []
+        with self.connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for apply, _ in batch:
+                conn.execute('SAVEPOINT booking_write')
+                try:
+                    results.append((True, apply(conn)))
+                    conn.execute('RELEASE booking_write')
+                except sqlite3.OperationalError:
+                    # Lock/busy errors abort the whole batch so it can be retried
+                    raise
+                except Exception as e:
+                    conn.execute('ROLLBACK TO booking_write')
+                    conn.execute('RELEASE booking_write')
+                    results.append((False, e))
+            conn.commit()
+        return results
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'writes': self.writes,
+            'avg_batch': round(self.writes / self.batches, 2) if self.batches else 0.0,
+            'pending': self._queue.qsize(),
+            'busy_retries': self.busy_retries,
+            'cancelled': self.cancelled,
+        }
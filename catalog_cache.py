@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from config import Config
+
+class CatalogCache:
+    """In-process read-through cache for catalog queries (TTL + LRU).
+
+    Keys are tuples such as ``('movies',)`` or ``('shows_by_movie', 3, False)``.
+    ``invalidate(prefix)`` drops every key starting with ``prefix`` and bumps
+    that prefix's version, so a load that raced with a write is not stored
+    and dependants (e.g. rendered pages) can tell their inputs changed.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = Config.CATALOG_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.CATALOG_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, key):
+        # A key is affected by invalidation of any of its prefixes
+        versions = self._versions
+        return sum(versions.get(key[:i], 0) for i in range(len(key) + 1))
+
+    def get_or_load(self, key, loader):
+        if self.ttl <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.version(key)
+
+        value = loader()
+
+        with self._lock:
+            # Skip the store if a write invalidated this key while we loaded
+            if self.version(key) == version:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *prefixes):
+        with self._lock:
+            for prefix in prefixes:
+                self._versions[prefix] = self._versions.get(prefix, 0) + 1
+                stale = [key for key in self._entries if key[:len(prefix)] == prefix]
+                for key in stale:
+                    del self._entries[key]
+                self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions[()] = self._versions.get((), 0) + 1
+
+    def cached(self, key_func):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_load(key_func(*args, **kwargs), lambda: func(*args, **kwargs))
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+catalog = CatalogCache()
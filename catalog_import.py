@@ -0,0 +1,206 @@
+"""Bulk import of movies, theaters and shows from CSV or JSON Lines.
+
+Usage:
+    python catalog_import.py movies movies.csv
+    python catalog_import.py shows schedule.jsonl --chunk-size 10000
+
+Input is parsed as a stream, each record is validated, and valid rows are
+loaded with ``executemany`` in chunked transactions. Invalid records are
+reported by line number and skipped; they never abort the import.
+Columns the database derives itself (a show's ``available_seats`` comes
+from its seat map) are ignored, with one warning per column.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from config import Config
+import simple_sqlite as db
+
+KINDS = ('movies', 'theaters', 'shows')
+MAX_REPORTED_ERRORS = 1000
+# Accepted for compatibility with exports, but derived rather than imported
+IGNORED_FIELDS = {'shows': {'available_seats': 'free seats are counted from the seat map'}}
+
+class RowError(ValueError):
+    pass
+
+def _text(record, field, required=False):
+    value = record.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{field} is required')
+    return value
+
+def _int(record, field, required=False, default=None, minimum=0):
+    value = _text(record, field, required)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f'{field} must be an integer')
+    if number < minimum:
+        raise RowError(f'{field} must be at least {minimum}')
+    return number
+
+def _float(record, field, required=False, default=None):
+    value = _text(record, field, required)
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise RowError(f'{field} must be a number')
+    if number < 0:
+        raise RowError(f'{field} must not be negative')
+    return number
+
+def _date(record, field, required=False):
+    value = _text(record, field, required)
+    if value:
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise RowError(f'{field} must be YYYY-MM-DD')
+    return value
+
+def _time(record, field):
+    value = _text(record, field, required=True)
+    try:
+        return datetime.strptime(value, '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise RowError(f'{field} must be HH:MM')
+
+class CatalogImporter:
+    def __init__(self, kind, chunk_size=None):
+        if kind not in KINDS:
+            raise ValueError(f'Unknown import kind: {kind}')
+        self.kind = kind
+        self.chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+        self.movie_ids = None
+        self.capacities = None
+        if kind == 'shows':
+            # Foreign keys are checked in memory rather than per row in SQL
+            self.movie_ids = db.get_movie_ids()
+            self.capacities = db.get_theater_capacities()
+
+    def validate(self, record):
+        if self.kind == 'movies':
+            return (_text(record, 'title', required=True), _text(record, 'description'),
+                    _int(record, 'duration', default=0), _text(record, 'genre'),
+                    _text(record, 'language'), _date(record, 'release_date'),
+                    _text(record, 'image_url'))
+
+        if self.kind == 'theaters':
+            return (_text(record, 'name', required=True), _text(record, 'location'),
+                    _int(record, 'total_seats', default=100, minimum=1))
+
+        movie_id = _int(record, 'movie_id', required=True, minimum=1)
+        theater_id = _int(record, 'theater_id', required=True, minimum=1)
+        if movie_id not in self.movie_ids:
+            raise RowError(f'movie {movie_id} does not exist')
+        if theater_id not in self.capacities:
+            raise RowError(f'theater {theater_id} does not exist')
+        # A new show has every seat free
+        capacity = self.capacities[theater_id] or 100
+        return (movie_id, theater_id, _date(record, 'show_date', required=True),
+                _time(record, 'show_time'), _float(record, 'price', required=True), capacity)
+
+    def _flush(self, rows):
+        if self.kind == 'movies':
+            return db.add_movies_bulk(rows)
+        if self.kind == 'theaters':
+            return db.add_theaters_bulk(rows)
+        return db.add_shows_bulk(rows)
+
+    def run(self, records):
+        """Load ``(line_number, record)`` pairs; returns a summary dict."""
+        result = {'kind': self.kind, 'read': 0, 'inserted': 0, 'failed': 0, 'errors': [], 'warnings': []}
+        ignored_fields = IGNORED_FIELDS.get(self.kind, {})
+        ignored = {}  # field -> [first line, rows]
+        chunk = []
+        for line_number, record in records:
+            result['read'] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise RowError(str(record))
+                chunk.append(self.validate(record))
+            except RowError as e:
+                result['failed'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append({'line': line_number, 'error': str(e)})
+                continue
+            for field in ignored_fields:
+                if _text(record, field):
+                    ignored.setdefault(field, [line_number, 0])[1] += 1
+            if len(chunk) >= self.chunk_size:
+                result['inserted'] += self._flush(chunk)
+                chunk = []
+        if chunk:
+            result['inserted'] += self._flush(chunk)
+        for field, (line_number, rows) in ignored.items():
+            result['warnings'].append({'line': line_number, 'warning': f'{field} ignored on {rows} row(s): '
+                                                                       f'{ignored_fields[field]}'})
+        return result
+
+def iter_csv(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        # line_num is the physical line the record ended on (header is line 1)
+        yield reader.line_num, record
+
+def iter_jsonl(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            record = ValueError(f'invalid JSON: {e}')
+        yield line_number, record
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+def import_stream(kind, stream, fmt='csv', chunk_size=None):
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    records = iter_jsonl(stream) if fmt == 'jsonl' else iter_csv(stream)
+    return CatalogImporter(kind, chunk_size).run(records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import movies, theaters or shows.')
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('path', help="CSV or JSONL file, or '-' for stdin")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='defaults to the file extension')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    db.init_database()
+    fmt = args.format or detect_format(args.path)
+    if args.path == '-':
+        result = import_stream(args.kind, sys.stdin, fmt, args.chunk_size)
+    else:
+        with open(args.path, encoding='utf-8-sig', newline='') as f:
+            result = import_stream(args.kind, f, fmt, args.chunk_size)
+
+    for error in result['errors']:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    for warning in result['warnings']:
+        print(f"line {warning['line']}: warning: {warning['warning']}", file=sys.stderr)
+    print(f"{result['kind']}: read {result['read']}, inserted {result['inserted']}, failed {result['failed']}")
+    return 1 if result['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
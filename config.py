@@ -10,6 +10,73 @@ class Config:
     DB_NAME = os.environ.get('DB_NAME', 'moviehub')
     DB_PORT = int(os.environ.get('DB_PORT', 3306))
 
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+    # SQLite connection pool
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', 'movienight.db')
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+    SQLITE_POOL_TIMEOUT = float(os.environ.get('SQLITE_POOL_TIMEOUT', 5.0))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+    SQLITE_STATEMENT_CACHE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+
+    # In-process catalog cache (TTL of 0 disables it)
+    CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 60))
+    CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', 1024))
+    # Longest a worker serves title suggestions before reloading titles
+    SEARCH_SUGGEST_MAX_AGE = float(os.environ.get('SEARCH_SUGGEST_MAX_AGE', 60))
+    # Movie cards per home page load / infinite-scroll fetch
+    MOVIES_PAGE_SIZE = int(os.environ.get('MOVIES_PAGE_SIZE', 24))
+
+    # Rendered-page cache for public catalog pages
+    PAGE_CACHE_TTL = float(os.environ.get('PAGE_CACHE_TTL', 60))
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 512))
+
+    # Bulk catalog import
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+
+    # Per-show booking locks
+    BOOKING_LOCK_PARTITIONS = int(os.environ.get('BOOKING_LOCK_PARTITIONS', 1024))
+    BOOKING_LOCK_TIMEOUT = float(os.environ.get('BOOKING_LOCK_TIMEOUT', 2.0))
+
+    # Group-commit writer for bookings and food orders
+    BOOKING_WRITER_ENABLED = os.environ.get('BOOKING_WRITER_ENABLED', '1') == '1'
+    BOOKING_WRITER_MAX_BATCH = int(os.environ.get('BOOKING_WRITER_MAX_BATCH', 64))
+    BOOKING_WRITER_LINGER_MS = float(os.environ.get('BOOKING_WRITER_LINGER_MS', 2))
+    BOOKING_WRITER_MAX_RETRIES = int(os.environ.get('BOOKING_WRITER_MAX_RETRIES', 5))
+    BOOKING_WRITER_TIMEOUT = float(os.environ.get('BOOKING_WRITER_TIMEOUT', 30))
+    # Bookings per show queued on the writer at once; more wait up to BOOKING_LOCK_TIMEOUT
+    BOOKING_WRITER_SHOW_PENDING = int(os.environ.get('BOOKING_WRITER_SHOW_PENDING', 64))
+
+    # Request profiling; X-Profile must match PROFILE_TOKEN (unset disables the header)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+    # Metrics; set METRICS_DIR to a shared directory when running several worker processes
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+    # Seat holds during checkout
+    SEAT_HOLD_TTL_SECONDS = int(os.environ.get('SEAT_HOLD_TTL_SECONDS', 300))
+    SEAT_HOLD_MAX_SEATS = int(os.environ.get('SEAT_HOLD_MAX_SEATS', 10))
+    # How long seat change events are kept for ?since= deltas
+    SEAT_EVENT_RETENTION_SECONDS = int(os.environ.get('SEAT_EVENT_RETENTION_SECONDS', 3600))
+
+    # Occupancy counter reconciliation; 0 disables the background pass
+    OCCUPANCY_RECONCILE_INTERVAL = int(os.environ.get('OCCUPANCY_RECONCILE_INTERVAL', 600))
+    OCCUPANCY_RECONCILE_CHUNK = int(os.environ.get('OCCUPANCY_RECONCILE_CHUNK', 500))
+
+    # Live seat updates (seat_stream.py); leave SEAT_STREAM_URL empty to poll only
+    SEAT_STREAM_URL = os.environ.get('SEAT_STREAM_URL', '')
+    SEAT_STREAM_ALLOW_ORIGIN = os.environ.get('SEAT_STREAM_ALLOW_ORIGIN', '*')
+    SEAT_STREAM_POLL_MS = int(os.environ.get('SEAT_STREAM_POLL_MS', 250))
+    SEAT_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('SEAT_STREAM_HEARTBEAT_SECONDS', 15))
+    SEAT_STREAM_QUEUE_SIZE = int(os.environ.get('SEAT_STREAM_QUEUE_SIZE', 256))
+
 class ProductionConfig(Config):
     DEBUG = False
 
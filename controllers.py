@@ -1,57 +1,144 @@
 from flask import render_template, request, jsonify, flash, redirect
 from datetime import datetime
+import logging
 import simple_sqlite as db
+from seat_holds import holds
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def _decode_cursor(raw, types):
+    """Keyset cursor from ``raw``, or None unless it decodes to a list matching ``types``."""
+    import base64
+    import json
+    
+    if not raw:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(raw))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    if not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types)):
+        return None
+    return tuple(values)
+
+def _encode_cursor(values):
+    import base64
+    import json
+    
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode() if values else None
 
 class MovieController:
+    @staticmethod
+    def _filters():
+        # Unknown or malformed values are ignored rather than rejected
+        from datetime import date
+        args = request.args
+        filters = {name: args.get(name, '').strip() for name in ('genre', 'language', 'city')}
+        filters['theater_id'] = args.get('theater_id', type=int)
+        year = args.get('year', type=int)
+        if year:
+            filters['released_from'], filters['released_to'] = f'{year:04d}-01-01', f'{year:04d}-12-31'
+        for name in ('released_from', 'released_to'):
+            value = args.get(name, '').strip()
+            try:
+                filters[name] = date.fromisoformat(value).isoformat()
+            except ValueError:
+                pass
+        return {name: value for name, value in filters.items() if value}
+    
+    @staticmethod
+    def _movie_page(filters):
+        limit = max(1, min(request.args.get('limit', Config.MOVIES_PAGE_SIZE, type=int), 100))
+        rows, next_after = db.get_movies_page(filters, after=request.args.get('cursor', type=int), limit=limit)
+        movies = []
+        for row in rows:
+            movies.append({
+                'id': row[0], 'title': row[1], 'description': row[2],
+                'duration': row[3], 'genre': row[4], 'language': row[5],
+                'release_date': row[6], 'image_url': row[7]
+            })
+        return movies, next_after
+    
     @staticmethod
     def index():
+        filters = MovieController._filters()
         try:
-            rows = db.get_all_movies()
-            movies = []
-            for row in rows:
-                movies.append({
-                    'id': row[0], 'title': row[1], 'description': row[2],
-                    'duration': row[3], 'genre': row[4], 'language': row[5],
-                    'release_date': row[6], 'image_url': row[7]
-                })
+            movies, next_cursor = MovieController._movie_page(filters)
+            counts = db.get_movie_facets(filters)
+            # Every facet as (value, label, count) for the filter selects
+            facets = {name: [(value, value, count) for value, count in counts[name]]
+                      for name in ('genre', 'language', 'year', 'city')}
+            facets['theater'] = counts['theater']
         except:
-            movies = []
-        return render_template('home.html', movies=movies)
+            movies, next_cursor, facets = [], None, {}
+        # Keep the active filters on the "more movies" link
+        filter_args = {k: v for k, v in request.args.items() if k not in ('cursor', 'limit') and v}
+        return render_template('home.html', movies=movies, facets=facets, filters=filters,
+                               year=request.args.get('year', type=int), next_cursor=next_cursor,
+                               filter_args=filter_args, is_first_page='cursor' not in request.args)
+    
+    @staticmethod
+    def list_movies():
+        movies, next_cursor = MovieController._movie_page(MovieController._filters())
+        return jsonify({'success': True, 'movies': movies, 'next_cursor': next_cursor})
+    
+    @staticmethod
+    def search():
+        query = request.args.get('q', '').strip()
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        results = []
+        for row in db.search_movies(query, limit) if query else []:
+            results.append({
+                'id': row[0], 'title': row[1], 'genre': row[4], 'language': row[5],
+                'release_date': row[6], 'image_url': row[7]
+            })
+        return jsonify({'success': True, 'query': query, 'results': results})
+    
+    @staticmethod
+    def suggest():
+        from movie_search import suggester
+        limit = max(1, min(request.args.get('limit', 10, type=int), 25))
+        return jsonify({'success': True, 'suggestions': suggester.suggest(request.args.get('prefix', ''), limit)})
     
     @staticmethod
     def details(movie_id):
         try:
-            rows = db.get_all_movies()
-            movie = None
-            for row in rows:
-                if row[0] == movie_id:
-                    movie = {
-                        'id': row[0], 'title': row[1], 'description': row[2],
-                        'duration': row[3], 'genre': row[4], 'language': row[5],
-                        'release_date': row[6], 'image_url': row[7]
-                    }
-                    break
-            
-            if not movie:
+            row = db.get_movie_by_id(movie_id)
+            if not row:
                 return render_template('error.html', message="Movie not found")
             
-            # Get shows for this movie
-            show_rows = db.get_all_shows()
+            movie = {
+                'id': row[0], 'title': row[1], 'description': row[2],
+                'duration': row[3], 'genre': row[4], 'language': row[5],
+                'release_date': row[6], 'image_url': row[7]
+            }
+            
+            # Upcoming shows by default (``upcoming=0`` includes past ones), a page at a time
+            upcoming_only = request.args.get('upcoming', '1') != '0'
+            limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+            after = _decode_cursor(request.args.get('cursor'), (str, str, int))
+            show_rows, next_after = db.get_movie_shows_page(movie_id, upcoming_only=upcoming_only,
+                                                            after=after, limit=limit)
             shows = []
             for row in show_rows:
-                if row[1] == movie_id:  # movie_id is at index 1
-                    shows.append({
-                        'id': row[0], 'movie_id': row[1], 'theater_id': row[2],
-                        'show_date': row[3], 'show_time': row[4], 'price': row[5],
-                        'available_seats': row[6], 'title': row[7], 'theater_name': row[8]
-                    })
+                shows.append({
+                    'id': row[0], 'movie_id': row[1], 'theater_id': row[2],
+                    'show_date': row[3], 'show_time': row[4], 'price': row[5],
+                    'available_seats': row[6], 'title': row[7], 'theater_name': row[8]
+                })
             
             reviews = []
             
             return render_template('movie_details.html', 
-                                 movie=movie, shows=shows, reviews=reviews)
+                                 movie=movie, shows=shows, reviews=reviews,
+                                 next_cursor=_encode_cursor(next_after), is_first_page=after is None,
+                                 upcoming_only=upcoming_only)
         except Exception as e:
-            print(f"Error in movie details: {str(e)}")
+            logger.exception('Error in movie details: %s', e)
             return render_template('error.html', message="Movie not found")
 
 class BookingController:
@@ -74,10 +161,13 @@ class BookingController:
                 'theater_name': show_data[8]
             }
             
-            booked_seats = db.get_booked_seats(show_id)
-            return render_template('book_seats.html', show=show, booked_seats=booked_seats)
+            booked_seats, held_seats, seat_version, _ = db.get_seat_availability(show_id)
+            return render_template('book_seats.html', show=show, booked_seats=booked_seats,
+                                   held_seats=held_seats, seat_rows=booked_seats.rows(),
+                                   seat_version=seat_version, hold_ttl=holds.ttl,
+                                   seat_stream_url=Config.SEAT_STREAM_URL)
         except Exception as e:
-            print(f"Error in book_seats: {str(e)}")
+            logger.exception('Error in book_seats: %s', e)
             return render_template('error.html', message="Error loading booking page")
     
     @staticmethod
@@ -86,30 +176,55 @@ class BookingController:
             data = request.get_json()
             
             # Extract booking data
-            show_id = data.get('show_id')
+            show_id = BookingController._show_id(data.get('show_id'))
+            if show_id is None:
+                return BookingController._invalid_show_response()
             customer_name = data.get('customer_name')
             customer_email = data.get('customer_email')
             customer_phone = data.get('customer_phone')
             selected_seats = data.get('selected_seats', [])
             total_amount = data.get('total_amount')
+            hold_id = data.get('hold_id')
             
             # Validate required fields
             if not all([show_id, customer_name, customer_email, selected_seats]):
                 return jsonify({'success': False, 'message': 'Missing required fields'})
             
-            # Create booking in database
-            seat_total = len(selected_seats) * 200  # Assuming base price
-            booking_id = db.add_booking(show_id, customer_name, customer_email, 
-                                      customer_phone, selected_seats, seat_total)
-            
-            # Add food order if items selected
+            # Food is written in the same transaction as the seats
             food_items = data.get('food_items', {})
             food_total = data.get('food_total', 0)
+            food_order = None
+            if food_items and any(qty > 0 for qty in food_items.values()):
+                food_order = (food_items, food_total)
             
-            if booking_id and food_items and any(qty > 0 for qty in food_items.values()):
-                db.add_food_order(booking_id, food_items, food_total)
+            # Create booking in database
+            seat_total = len(selected_seats) * 200  # Assuming base price
+            try:
+                booking_id = db.add_booking(show_id, customer_name, customer_email, 
+                                          customer_phone, selected_seats, seat_total,
+                                          hold_token=hold_id, food_order=food_order)
+            except db.SeatConflictError as e:
+                metrics.bookings.inc(result='conflict')
+                return jsonify({
+                    'success': False,
+                    'message': str(e),
+                    'conflict_seats': e.seats
+                })
+            except db.BookingBusyError as e:
+                metrics.bookings.inc(result='busy')
+                return BookingController._busy_response(e)
+            except db.WriteTimeoutError as e:
+                metrics.bookings.inc(result='timeout')
+                return BookingController._timeout_response(e)
+            except ValueError as e:
+                metrics.bookings.inc(result='invalid')
+                return jsonify({'success': False, 'message': str(e)})
             
             if booking_id:
+                metrics.bookings.inc(result='success')
+                metrics.seats_booked.inc(len(selected_seats))
+                if food_order:
+                    metrics.food_attachments.inc()
                 return jsonify({
                     'success': True, 
                     'booking_id': booking_id,
@@ -122,11 +237,109 @@ class BookingController:
                 })
             
         except Exception as e:
+            metrics.bookings.inc(result='error')
             return jsonify({
                 'success': False, 
                 'message': f'Error creating booking: {str(e)}'
             })
     
+    @staticmethod
+    def availability(show_id):
+        import base64
+        from seat_map import SEATS_PER_ROW
+        
+        since = request.args.get('since', type=int)
+        try:
+            db.expire_show_holds(show_id)
+            booked, held, version, changed = db.get_seat_availability(show_id, since)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 404
+        
+        if changed is not None:
+            # Only the seats touched after ``since``, with their current state
+            payload = {
+                'delta': True,
+                'booked': booked.labels(changed & booked.bits),
+                'held': held.labels(changed & held.bits),
+                'free': booked.labels(changed & ~booked.bits & ~held.bits),
+            }
+        else:
+            # Bitmaps are little-endian, row-major, SEATS_PER_ROW seats per row (bit 0 = A1)
+            payload = {
+                'delta': False,
+                'capacity': booked.capacity,
+                'seats_per_row': SEATS_PER_ROW,
+                'booked': base64.b64encode(booked.to_blob()).decode(),
+                'held': base64.b64encode(held.to_blob()).decode(),
+            }
+        
+        response = jsonify({'success': True, 'show_id': show_id, 'version': version, **payload})
+        # The ETag names the seat state, so an up-to-date poller gets a 304 whatever ``since`` it sends
+        response.set_etag(f'show-{show_id}-v{version}')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    
+    @staticmethod
+    def _show_id(value):
+        # Clients send the id as a number or a numeric string; holds compare it as an int
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return None
+    
+    @staticmethod
+    def _invalid_show_response():
+        response = jsonify({'success': False, 'message': 'show_id must be an integer'})
+        response.status_code = 400
+        return response
+    
+    @staticmethod
+    def _busy_response(error):
+        response = jsonify({'success': False, 'message': str(error), 'retry': True})
+        response.status_code = 429
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    @staticmethod
+    def _timeout_response(error):
+        # Not a plain failure: ``applied`` is False (safe to retry) or None (may have been booked)
+        outcome = 'not_applied' if error.applied is False else 'unknown'
+        response = jsonify({'success': False, 'message': str(error), 'timeout': True, 'outcome': outcome,
+                            'retry': error.applied is False})
+        response.status_code = 503
+        if error.applied is False:
+            response.headers['Retry-After'] = '1'
+        return response
+    
+    @staticmethod
+    def place_hold():
+        try:
+            data = request.get_json()
+            show_id = BookingController._show_id(data.get('show_id'))
+            if show_id is None:
+                return BookingController._invalid_show_response()
+            seats = data.get('seats', [])
+            
+            # Replace the customer's previous hold when they change their selection
+            if data.get('previous_hold_id'):
+                holds.release(data.get('previous_hold_id'))
+            
+            hold = holds.place(show_id, seats)
+            return jsonify({'success': True, **hold, 'expires_in': holds.ttl})
+        except db.SeatConflictError as e:
+            return jsonify({'success': False, 'message': str(e), 'conflict_seats': e.seats})
+        except db.BookingBusyError as e:
+            return BookingController._busy_response(e)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'Error holding seats: {str(e)}'})
+    
+    @staticmethod
+    def release_hold(hold_id):
+        return jsonify({'success': holds.release(hold_id)})
+    
     @staticmethod
     def booking_success(booking_id):
         try:
@@ -151,7 +364,7 @@ class BookingController:
             }
             return render_template('booking_success.html', booking=booking)
         except Exception as e:
-            print(f"Error in booking_success: {str(e)}")
+            logger.exception('Error in booking_success: %s', e)
             return render_template('error.html', message="Error loading booking details")
     
     @staticmethod
@@ -170,12 +383,82 @@ class ReviewController:
 class AdminController:
     @staticmethod
     def dashboard():
-        return render_template('admin/dashboard.html', datetime=datetime)
+        from datetime import timedelta
+        today = datetime.utcnow().date()
+        sales = {
+            'Today': db.get_sales_report(today.isoformat(), group_by=())[1],
+            'Last 30 days': db.get_sales_report((today - timedelta(days=29)).isoformat(), group_by=())[1],
+        }
+        return render_template('admin/dashboard.html', datetime=datetime, sales=sales)
+    
+    @staticmethod
+    def analytics():
+        args = request.args
+        group_by = [name for name in args.get('group_by', 'day').split(',') if name]
+        try:
+            rows, totals = db.get_sales_report(
+                args.get('from'),
+                args.get('to'),
+                group_by,
+                movie_id=args.get('movie_id', type=int),
+                theater_id=args.get('theater_id', type=int),
+                sort=args.get('sort'),
+                limit=max(1, min(args.get('limit', 1000, type=int), 10000))
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, 'group_by': group_by, 'rows': rows, 'totals': totals})
+    
+    @staticmethod
+    def rebuild_analytics():
+        return jsonify({'success': True, 'rows': db.rebuild_sales_rollup()})
+    
+    @staticmethod
+    def cache_stats():
+        from page_cache import pages
+        from movie_search import suggester
+        return jsonify({'catalog': db.catalog.stats(), 'pages': pages.stats(),
+                        'booking_writer': db.writer.stats(), 'suggest': suggester.stats()})
+    
+    @staticmethod
+    def reconcile_occupancy():
+        from occupancy import reconciler
+        return jsonify({'success': True, **reconciler.run_once()})
+    
+    @staticmethod
+    def profiles():
+        import profiling
+        return jsonify({'profiles': profiling.list_profiles()})
+    
+    @staticmethod
+    def profile_detail(name):
+        import io
+        import pstats
+        import profiling
+        from flask import send_file
+        
+        path = profiling.profile_path(name)
+        if not path:
+            return jsonify({'success': False, 'message': 'Profile not found'}), 404
+        if request.args.get('download') == '1':
+            return send_file(path, as_attachment=True, download_name=name)
+        
+        # Text summary, e.g. ?sort=tottime&limit=50
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls', 'ncalls'):
+            sort = 'cumulative'
+        limit = request.args.get('limit', 40, type=int)
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
     
     @staticmethod
     def movies():
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+        # Newest first; the cursor is the id of the previous page's last movie
+        after = request.args.get('cursor', type=int)
         try:
-            rows = db.get_all_movies()
+            rows, next_after = db.get_movies_page(after=after, limit=limit)
             movies = []
             for row in rows:
                 movies.append({
@@ -184,17 +467,26 @@ class AdminController:
                     'release_date': row[6], 'image_url': row[7]
                 })
         except:
-            movies = []
-        return render_template('admin/movies.html', movies=movies)
+            movies, next_after = [], None
+        return render_template('admin/movies.html', movies=movies, next_cursor=next_after,
+                               limit=limit, is_first_page=after is None)
     
     @staticmethod
     def theaters():
+        from datetime import timedelta
         try:
             rows = db.get_all_theaters()
+            # Advance sales: seats sold for shows in the coming week
+            today = datetime.now().date()
+            sold = {}
+            for theater_id, _, seats_sold in db.get_theater_daily_sales(
+                    date_from=today.isoformat(), date_to=(today + timedelta(days=6)).isoformat()):
+                sold[theater_id] = sold.get(theater_id, 0) + seats_sold
             theaters = []
             for row in rows:
                 theaters.append({
-                    'id': row[0], 'name': row[1], 'location': row[2], 'total_seats': row[3]
+                    'id': row[0], 'name': row[1], 'location': row[2], 'total_seats': row[3],
+                    'sold_this_week': sold.get(row[0], 0)
                 })
         except:
             theaters = []
@@ -202,17 +494,28 @@ class AdminController:
     
     @staticmethod
     def shows():
+        args = request.args
+        # Upcoming shows by default; ``upcoming=0`` or an explicit date_from widens the window
+        date_from = args.get('date_from') or (None if args.get('upcoming') == '0'
+                                              else datetime.now().date().isoformat())
+        limit = max(1, min(args.get('limit', 50, type=int), 200))
+        after = _decode_cursor(args.get('cursor'), (str, str, int))
         try:
-            show_rows = db.get_all_shows()
-            movie_rows = db.get_all_movies()
+            show_rows, next_after = db.get_shows_page(
+                movie_id=args.get('movie_id', type=int), theater_id=args.get('theater_id', type=int),
+                date_from=date_from, date_to=args.get('date_to') or None, after=after, limit=limit)
+            movie_rows = db.get_movie_choices()
             theater_rows = db.get_all_theaters()
+            occupancy = db.get_shows_occupancy(row[0] for row in show_rows)
             
             shows = []
             for row in show_rows:
+                capacity, sold, held, free = occupancy.get(row[0], (None, 0, 0, row[6]))
                 shows.append({
                     'id': row[0], 'movie_id': row[1], 'theater_id': row[2],
                     'show_date': row[3], 'show_time': row[4], 'price': row[5],
-                    'available_seats': row[6], 'title': row[7], 'theater_name': row[8]
+                    'available_seats': free, 'title': row[7], 'theater_name': row[8],
+                    'capacity': capacity, 'sold': sold, 'held': held
                 })
             
             movies = []
@@ -222,47 +525,68 @@ class AdminController:
             theaters = []
             for row in theater_rows:
                 theaters.append({'id': row[0], 'name': row[1], 'location': row[2]})
-        except:
-            shows, movies, theaters = [], [], []
-            
-        return render_template('admin/shows.html', shows=shows, movies=movies, theaters=theaters)
+        except Exception as e:
+            logger.exception('Error loading shows: %s', e)
+            shows, next_after, movies, theaters = [], None, [], []
+        
+        # Keep the active filters on the "next page" link
+        filter_args = {k: v for k, v in args.items() if k != 'cursor' and v}
+        return render_template('admin/shows.html', shows=shows, movies=movies, theaters=theaters,
+                               next_cursor=_encode_cursor(next_after),
+                               filter_args=filter_args, date_from=date_from, is_first_page=after is None)
     
     @staticmethod
     def bookings():
+        import json
+        
+        args = request.args
+        filters = {
+            'show_id': args.get('show_id', type=int),
+            'movie_id': args.get('movie_id', type=int),
+            'theater_id': args.get('theater_id', type=int),
+            'date_from': args.get('date_from') or None,
+            'date_to': args.get('date_to') or None,
+            'customer_email': args.get('email') or None,
+        }
+        limit = max(1, min(args.get('limit', 50, type=int), 200))
+        # (booking_date, id) of the previous page's last row; anything else starts over
+        after = _decode_cursor(args.get('cursor'), (str, int))
+        
         try:
-            conn = db.get_connection()
-            cursor = conn.cursor()
+            booking_rows, next_after = db.get_bookings_page(after=after, limit=limit, **filters)
             
-            cursor.execute('''SELECT b.*, s.show_date, s.show_time, m.title, t.name as theater_name
-                             FROM bookings b
-                             LEFT JOIN shows s ON b.show_id = s.id
-                             LEFT JOIN movies m ON s.movie_id = m.id
-                             LEFT JOIN theaters t ON s.theater_id = t.id
-                             ORDER BY b.booking_date DESC''')
-            
-            booking_rows = cursor.fetchall()
-            conn.close()
-            
-            import json
             bookings = []
             for row in booking_rows:
+                seat_numbers = json.loads(row[5]) if row[5] else []
                 bookings.append({
                     'id': row[0],
                     'show_id': row[1],
                     'customer_name': row[2],
                     'customer_email': row[3],
                     'customer_phone': row[4],
-                    'seat_numbers': json.loads(row[5]) if row[5] else [],
-                    'total_amount': row[6],
+                    'seat_numbers': seat_numbers,
+                    'seats_booked': len(seat_numbers),
+                    'total_amount': row[6] or 0,
                     'booking_date': row[7],
                     'show_date': row[8],
                     'show_time': row[9],
                     'title': row[10],
-                    'theater_name': row[11]
+                    'theater_name': row[11],
+                    'status': 'confirmed'
                 })
-        except:
-            bookings = []
-        return render_template('admin/bookings.html', bookings=bookings)
+            
+            next_cursor = _encode_cursor(next_after)
+            movies = db.get_movie_choices()
+            theaters = db.get_all_theaters()
+        except Exception as e:
+            logger.exception('Error loading bookings: %s', e)
+            bookings, next_cursor, movies, theaters = [], None, [], []
+        
+        # Keep the active filters on the "next page" link
+        filter_args = {k: v for k, v in args.items() if k != 'cursor' and v}
+        return render_template('admin/bookings.html', bookings=bookings, next_cursor=next_cursor,
+                               filter_args=filter_args, movies=movies, theaters=theaters,
+                               is_first_page=after is None)
     
     @staticmethod
     def add_movie():
@@ -300,19 +624,97 @@ class AdminController:
     def add_show():
         data = request.form
         try:
-            print(f"\n🎬 Adding show with data: {dict(data)}")
+            logger.debug('Adding show with data: %s', dict(data))
+            theater = db.get_theater_by_id(int(data.get('theater_id')))
+            if not theater:
+                raise ValueError('Theater not found')
             db.add_show(
                 int(data.get('movie_id')),
-                int(data.get('theater_id')),
+                theater[0],
                 data.get('show_date'),
                 data.get('show_time'),
                 float(data.get('price', 0)),
-                100
+                theater[3] or 100
             )
             flash('Show added successfully!', 'success')
         except Exception as e:
-            print(f"❌ Error adding show: {str(e)}")
+            logger.warning('Error adding show: %s', e)
+            flash(f'Error: {str(e)}', 'error')
+        return redirect('/admin/shows')
+    
+    @staticmethod
+    def import_catalog():
+        import catalog_import
+        
+        kind = request.form.get('kind', '')
+        upload = request.files.get('file')
+        wants_json = request.accept_mimetypes.best == 'application/json'
+        if kind not in catalog_import.KINDS or not upload or not upload.filename:
+            message = 'Choose what to import and a CSV or JSONL file'
+            if wants_json:
+                return jsonify({'success': False, 'message': message})
+            flash(message, 'error')
+            return redirect('/admin/')
+        
+        fmt = request.form.get('format') or catalog_import.detect_format(upload.filename)
+        try:
+            result = catalog_import.import_stream(kind, upload.stream, fmt)
+        except Exception as e:
+            logger.exception('Catalog import failed: %s', e)
+            if wants_json:
+                return jsonify({'success': False, 'message': str(e)})
+            flash(f'Import failed: {str(e)}', 'error')
+            return redirect('/admin/')
+        
+        if wants_json:
+            return jsonify({'success': result['failed'] == 0, **result})
+        
+        flash(f"Imported {result['inserted']} of {result['read']} {kind}",
+              'success' if not result['failed'] else 'error')
+        for error in result['errors'][:5]:
+            flash(f"Line {error['line']}: {error['error']}", 'error')
+        if result['failed'] > 5:
+            flash(f"...and {result['failed'] - 5} more rejected rows", 'error')
+        for warning in result['warnings']:
+            flash(f"Line {warning['line']}: {warning['warning']}", 'warning')
+        return redirect(f'/admin/{kind}')
+    
+    @staticmethod
+    def schedule_shows():
+        from show_schedule import PriceTemplate, generate_schedule
+        
+        data = request.form
+        preview = data.get('preview') == '1'
+        wants_json = preview or request.accept_mimetypes.best == 'application/json'
+        try:
+            price_template = PriceTemplate(
+                data.get('base_price', 0),
+                PriceTemplate.parse_slot_prices(data.get('slot_prices')),
+                data.get('weekend_surcharge') or 0
+            )
+            weekdays = [int(d) for d in data.getlist('weekdays')] or None
+            result = generate_schedule(
+                int(data.get('movie_id')),
+                [int(t) for t in data.getlist('theater_ids')],
+                data.get('start_date'),
+                data.get('end_date'),
+                data.get('time_slots', ''),
+                price_template,
+                weekdays=weekdays,
+                preview=preview
+            )
+        except (TypeError, ValueError) as e:
+            if wants_json:
+                return jsonify({'success': False, 'message': str(e)})
             flash(f'Error: {str(e)}', 'error')
+            return redirect('/admin/shows')
+        
+        if wants_json:
+            shows = [dict(zip(('movie_id', 'theater_id', 'show_date', 'show_time', 'price', 'available_seats'), row))
+                     for row in result['shows'][:500]]
+            return jsonify({'success': True, **result, 'shows': shows})
+        
+        flash(f"Scheduled {result['created']} shows ({result['skipped']} slots already taken)", 'success')
         return redirect('/admin/shows')
     
     @staticmethod
@@ -331,7 +733,6 @@ class FoodController:
     @staticmethod
     def food_menu():
         try:
-            db.init_food_table()
             food_items = db.get_food_items()
             return render_template('food_menu.html', food_items=food_items)
         except Exception as e:
@@ -359,11 +760,17 @@ class FoodController:
                 'message': f'Error adding food order: {str(e)}'
             })
 
+class MetricsController:
+    @staticmethod
+    def metrics():
+        return metrics.registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 class DatabaseController:
     @staticmethod
     def init_db():
-        db.init_food_table()
-        return jsonify({'success': True, 'message': 'Database initialized successfully'})
+        version = db.init_database()
+        return jsonify({'success': True, 'message': 'Database initialized successfully',
+                        'schema_version': version})
     
     @staticmethod
     def update_images():
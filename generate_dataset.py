@@ -0,0 +1,375 @@
+"""Synthetic production-scale dataset for benchmarks and load tests.
+
+Usage:
+    python generate_dataset.py movienight_large.db --scale large
+    python generate_dataset.py bench.db --movies 2000 --shows 200000 --bookings 2000000 --seed 7
+
+The same seed, sizes and ``--start-date`` always produce the same
+database; shows start on DEFAULT_START_DATE unless told otherwise.
+``--relative-to-today`` instead starts them 30 days ago, so there is both
+booking history and upcoming shows, at the cost of a different database
+each day. Only the schema and food menu come from the migrations, not the
+demo catalog, so the row counts are exactly the requested sizes. Popularity is skewed: a few movies sell most tickets (Zipf-like
+weights) and evening shows sell more than matinees, so some shows sell out
+while most stay partly empty. Seats are sold front row first, so every seat map agrees
+with its bookings and ``available_seats`` is exact.
+
+Rows go in with ``executemany`` in large transactions with journaling and
+fsync off. Secondary indexes are dropped first and rebuilt once at the end,
+followed by ANALYZE, and the finished file is switched to WAL.
+"""
+import argparse
+import calendar
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+import migrations
+from seat_map import SeatMap, SEATS_PER_ROW, ROW_LABELS
+
+# Fixed so that runs on different days give the same database
+DEFAULT_START_DATE = date(2026, 1, 1)
+
+SCALES = {
+    'tiny': {'movies': 50, 'theaters': 10, 'shows': 2000, 'bookings': 10000},
+    'small': {'movies': 200, 'theaters': 25, 'shows': 20000, 'bookings': 100000},
+    'medium': {'movies': 1000, 'theaters': 100, 'shows': 100000, 'bookings': 1000000},
+    'large': {'movies': 5000, 'theaters': 400, 'shows': 500000, 'bookings': 5000000},
+}
+
+GENRES = [('Action', 30), ('Drama', 25), ('Comedy', 20), ('Thriller', 10), ('Romance', 8),
+          ('Horror', 5), ('Animation', 5), ('Sci-Fi', 7), ('Documentary', 2)]
+LANGUAGES = [('English', 40), ('Hindi', 35), ('Tamil', 8), ('Telugu', 8), ('Marathi', 4),
+             ('Bengali', 3), ('Kannada', 2)]
+TITLE_WORDS = ('Night', 'Shadow', 'Return', 'Last', 'City', 'Storm', 'Kingdom', 'Dream', 'Fire', 'River',
+               'Secret', 'Empire', 'Hunter', 'Silent', 'Golden', 'Broken', 'Wild', 'Iron', 'Lost', 'Star')
+CHAINS = ('PVR Cinemas', 'INOX', 'Cinepolis', 'Carnival', 'Miraj', 'Cineplex', 'Movietime')
+CITIES = ('Mumbai', 'Delhi', 'Bengaluru', 'Pune', 'Chennai', 'Hyderabad', 'Kolkata', 'Ahmedabad',
+          'Jaipur', 'Lucknow', 'Indore', 'Nagpur', 'Surat', 'Kochi', 'Chandigarh')
+HALL_SIZES = (80, 96, 120, 144, 180, 240)
+# Time slot and its relative demand
+SLOTS = (('09:30', 0.4), ('12:45', 0.7), ('15:30', 0.9), ('18:45', 1.6), ('21:30', 1.4), ('23:45', 0.5))
+FIRST_NAMES = ('Aarav', 'Diya', 'Vihaan', 'Ananya', 'Arjun', 'Isha', 'Kabir', 'Meera', 'Rohan', 'Sara')
+LAST_NAMES = ('Sharma', 'Patel', 'Iyer', 'Reddy', 'Khan', 'Singh', 'Das', 'Nair', 'Gupta', 'Joshi')
+FOOD_ORDER_RATE = 0.4
+CHUNK_SIZE = 50000
+
+def _weighted(rng, pairs):
+    return rng.choices([p[0] for p in pairs], weights=[p[1] for p in pairs])[0]
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def relative_start_date(today=None):
+    """Start date for ``--relative-to-today``: a month of history before ``today``."""
+    return (today or date.today()) - timedelta(days=30)
+
+def _next_id(conn, table):
+    return (conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+
+class DatasetGenerator:
+    def __init__(self, conn, movies, theaters, shows, bookings, seed=42, days=90, start_date=None,
+                 food_order_rate=FOOD_ORDER_RATE, log=None):
+        self.conn = conn
+        self.counts = {'movies': movies, 'theaters': theaters, 'shows': shows, 'bookings': bookings}
+        self.rng = random.Random(seed)
+        self.days = days
+        self.food_order_rate = food_order_rate
+        self.log = log or (lambda message: None)
+        self.start_date = start_date or DEFAULT_START_DATE
+
+    def _insert(self, sql, rows):
+        total = 0
+        for chunk in _chunks(rows):
+            self.conn.executemany(sql, chunk)
+            total += len(chunk)
+        return total
+
+    def movies(self):
+        rng = self.rng
+        first_id = _next_id(self.conn, 'movies')
+        count = self.counts['movies']
+
+        def rows():
+            for i in range(count):
+                words = rng.sample(TITLE_WORDS, rng.randint(1, 3))
+                title = ' '.join(['The'] * (rng.random() < 0.3) + words) + (f' {rng.randint(2, 4)}' if rng.random() < 0.1 else '')
+                genre = _weighted(rng, GENRES)
+                release = self.start_date - timedelta(days=rng.randint(-30, 365))
+                yield (first_id + i, title, f'A {genre.lower()} film.', rng.randint(85, 185), genre,
+                       _weighted(rng, LANGUAGES), release.isoformat(), '')
+
+        self._insert('''INSERT INTO movies (id, title, description, duration, genre, language, release_date, image_url)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows())
+        ids = list(range(first_id, first_id + count))
+        # Zipf-like popularity: a handful of hits, a long tail
+        order = ids[:]
+        rng.shuffle(order)
+        self.popularity = {movie_id: 1.0 / (rank + 1) ** 1.1 for rank, movie_id in enumerate(order)}
+        return ids
+
+    def theaters(self):
+        rng = self.rng
+        first_id = _next_id(self.conn, 'theaters')
+        count = self.counts['theaters']
+        rows = []
+        for i in range(count):
+            city = CITIES[i % len(CITIES)]
+            rows.append((first_id + i, f'{rng.choice(CHAINS)} {city} {i // len(CITIES) + 1}', city,
+                         rng.choice(HALL_SIZES)))
+        self._insert('INSERT INTO theaters (id, name, location, total_seats) VALUES (?, ?, ?, ?)', rows)
+        return {row[0]: row[3] for row in rows}
+
+    def shows(self, movie_ids, capacities):
+        """Spread shows over theaters, days and slots; returns (show_ids, demand weights, capacities)."""
+        rng = self.rng
+        first_id = _next_id(self.conn, 'shows')
+        count = self.counts['shows']
+        theater_ids = list(capacities)
+        movie_weights = [self.popularity[m] for m in movie_ids]
+        movie_picks = rng.choices(movie_ids, weights=movie_weights, k=count)
+
+        # Each (day, theater, slot) is used at most once; stretch the calendar if needed
+        per_day = len(theater_ids) * len(SLOTS)
+        days = max(self.days, -(-count // per_day))
+        if days > self.days:
+            self.log(f'{count} shows need {days} days of schedule')
+        positions = sorted(rng.sample(range(days * per_day), count))
+
+        self.show_starts = []
+        self.show_prices = []
+        show_capacity = []
+        demand = []
+
+        def rows():
+            for i, position in enumerate(positions):
+                day, rest = divmod(position, per_day)
+                theater_id = theater_ids[rest // len(SLOTS)]
+                slot, slot_demand = SLOTS[rest % len(SLOTS)]
+                show_date = self.start_date + timedelta(days=day)
+                hours, minutes = map(int, slot.split(':'))
+                self.show_starts.append(calendar.timegm(show_date.timetuple()) + hours * 3600 + minutes * 60)
+                weekend = show_date.weekday() >= 5
+                price = float(150 + 50 * rng.randint(0, 4) + (50 if weekend else 0))
+                self.show_prices.append(price)
+                capacity = SeatMap(capacities[theater_id]).capacity
+                movie_id = movie_picks[i]
+                show_capacity.append(capacity)
+                demand.append(self.popularity[movie_id] * slot_demand * (1.3 if weekend else 1.0))
+                yield (first_id + i, movie_id, theater_id, show_date.isoformat(), slot, price, capacity)
+
+        self._insert('''INSERT INTO shows (id, movie_id, theater_id, show_date, show_time, price, available_seats)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''', rows())
+        return list(range(first_id, first_id + count)), demand, show_capacity
+
+    def bookings(self, show_ids, demand, show_capacity):
+        """Sell seats front row first; returns seats sold per show index.
+
+        Draws that land on a sold-out show are drawn again, so exactly
+        ``bookings`` rows go in unless every seat is sold first.
+        """
+        # Millions of rows: this loop sticks to random() and string building
+        rng = self.rng
+        rand = rng.random
+        first_id = _next_id(self.conn, 'bookings')
+        count = self.counts['bookings']
+        sold = [0] * len(show_ids)
+        food = list(self.conn.execute('SELECT id, price FROM food_items'))
+        labels = [f'"{ROW_LABELS[i // SEATS_PER_ROW]}{i % SEATS_PER_ROW + 1}"'
+                  for i in range(SEATS_PER_ROW * len(ROW_LABELS))]
+        party_sizes = (1, 2, 2, 2, 3, 4, 4, 5, 6)
+        names = [(f'{first} {last}', f'{first}.{last}'.lower()) for first in FIRST_NAMES for last in LAST_NAMES]
+        cum_weights = []
+        total = 0.0
+        for weight in demand:
+            total += weight
+            cum_weights.append(total)
+
+        self.food_orders = []
+        inserted = [0]
+
+        def rows():
+            booking_id = first_id
+            # Every booking takes at least one seat
+            remaining = min(count, sum(show_capacity))
+            while remaining > 0:
+                for index in rng.choices(range(len(show_ids)), cum_weights=cum_weights, k=min(remaining, CHUNK_SIZE)):
+                    taken = sold[index]
+                    seats = min(party_sizes[int(rand() * 9)], show_capacity[index] - taken)
+                    if seats <= 0:
+                        continue  # sold out; popular shows absorb the skew, the next round redraws
+                    sold[index] = taken + seats
+                    name, handle = names[int(rand() * len(names))]
+                    # Booked between ten minutes and two weeks before the show starts
+                    booked_at = self.show_starts[index] - 600 - int(rand() * 14 * 86400)
+                    yield (booking_id, show_ids[index], name, f'{handle}{int(rand() * 99999) + 1}@example.com',
+                           f'9{int(rand() * 900000000) + 100000000}',
+                           '[' + ', '.join(labels[taken:taken + seats]) + ']', self.show_prices[index] * seats,
+                           time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(booked_at)))
+                    if food and rand() < self.food_order_rate:
+                        items = {}
+                        total_food = 0.0
+                        for food_id, price in rng.sample(food, 1 + int(rand() * 3)):
+                            qty = 1 + int(rand() * 3)
+                            items[str(food_id)] = qty
+                            total_food += price * qty
+                        self.food_orders.append((booking_id, json.dumps(items), total_food, 0))
+                    booking_id += 1
+                    inserted[0] += 1
+                    remaining -= 1
+
+        self._insert('''INSERT INTO bookings (id, show_id, customer_name, customer_email, customer_phone,
+                                              seat_numbers, total_amount, booking_date)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows())
+        self.counts['bookings'] = inserted[0]
+        return sold
+
+    def seat_maps(self, show_ids, show_capacity, sold):
+        rows = ((show_id, show_capacity[i], SeatMap(show_capacity[i], (1 << sold[i]) - 1).to_blob())
+                for i, show_id in enumerate(show_ids) if sold[i])
+        self._insert('INSERT INTO seat_maps (show_id, capacity, booked, version) VALUES (?, ?, ?, 1)', rows)
+        self._insert('UPDATE shows SET available_seats = available_seats - ? WHERE id = ?',
+                     ((sold[i], show_id) for i, show_id in enumerate(show_ids) if sold[i]))
+
+    def occupancy(self, show_ids, show_capacity, sold):
+        self._insert('''INSERT OR REPLACE INTO show_occupancy (show_id, theater_id, show_date, capacity, sold, held)
+                        SELECT id, theater_id, show_date, ?, ?, 0 FROM shows WHERE id = ?''',
+                     ((show_capacity[i], sold[i], show_id) for i, show_id in enumerate(show_ids)))
+        self.conn.execute('DELETE FROM theater_daily_sales')
+        self.conn.execute('''INSERT INTO theater_daily_sales (theater_id, show_date, seats_sold)
+                             SELECT theater_id, show_date, SUM(sold) FROM show_occupancy
+                             WHERE theater_id IS NOT NULL AND show_date IS NOT NULL
+                             GROUP BY theater_id, show_date HAVING SUM(sold) > 0''')
+
+    def sales_rollup(self):
+        self.conn.execute('DELETE FROM sales_rollup')
+        self.conn.execute('''INSERT INTO sales_rollup
+            (day, movie_id, theater_id, bookings, tickets, ticket_revenue, food_orders, food_revenue)
+            SELECT date(b.booking_date), s.movie_id, s.theater_id, COUNT(*),
+                   COALESCE(SUM(json_array_length(b.seat_numbers)), 0), COALESCE(SUM(b.total_amount), 0),
+                   COALESCE(SUM(f.orders), 0), COALESCE(SUM(f.revenue), 0)
+            FROM bookings b
+            JOIN shows s ON s.id = b.show_id
+            LEFT JOIN (SELECT booking_id, COUNT(*) AS orders, SUM(total_amount) AS revenue
+                       FROM food_orders GROUP BY booking_id) f ON f.booking_id = b.id
+            GROUP BY date(b.booking_date), s.movie_id, s.theater_id''')
+
+    def run(self):
+        timings = {}
+
+        def step(name, func, *args):
+            started = time.perf_counter()
+            result = func(*args)
+            timings[name] = round(time.perf_counter() - started, 2)
+            self.log(f'{name}: {timings[name]}s')
+            return result
+
+        movie_ids = step('movies', self.movies)
+        capacities = step('theaters', self.theaters)
+        show_ids, demand, show_capacity = step('shows', self.shows, movie_ids, capacities)
+        sold = step('bookings', self.bookings, show_ids, demand, show_capacity)
+        step('seat_maps', self.seat_maps, show_ids, show_capacity, sold)
+        step('occupancy', self.occupancy, show_ids, show_capacity, sold)
+        food_orders = step('food_orders', self._insert,
+                           'INSERT INTO food_orders (booking_id, items, total_amount, discount_applied) VALUES (?, ?, ?, ?)',
+                           self.food_orders)
+        self.counts['food_orders'] = food_orders
+        step('sales_rollup', self.sales_rollup)
+        self.counts['sold_out_shows'] = sum(1 for i, s in enumerate(sold) if s and s >= show_capacity[i])
+        return {'counts': self.counts, 'timings': timings}
+
+def _drop_indexes(conn):
+    indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX {name}')
+    return [sql for _, sql in indexes]
+
+def generate(path, movies, theaters, shows, bookings, seed=42, days=90, start_date=None, log=None):
+    """Create ``path`` (which must not exist) and fill it; returns counts and timings.
+
+    The same sizes, seed and ``start_date`` (default DEFAULT_START_DATE)
+    give an identical database.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f'{path} already exists')
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        migrations.migrate(conn, sample_data=False)
+        # Throwaway file until it is finished, so skip the journal and fsync
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('PRAGMA cache_size=-262144')
+        conn.execute('PRAGMA temp_store=MEMORY')
+
+        index_sql = _drop_indexes(conn)
+        conn.execute('BEGIN')
+        result = DatasetGenerator(conn, movies, theaters, shows, bookings, seed, days, start_date, log=log).run()
+        conn.execute('COMMIT')
+
+        index_started = time.perf_counter()
+        conn.execute('BEGIN')
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.execute('COMMIT')
+        result['timings']['indexes'] = round(time.perf_counter() - index_started, 2)
+        log(f"indexes: {result['timings']['indexes']}s")
+
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA journal_mode=WAL')
+    except BaseException:
+        conn.close()
+        os.remove(path)
+        raise
+    conn.close()
+    result['timings']['total'] = round(time.perf_counter() - started, 2)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic MovieNight database.')
+    parser.add_argument('path', help='database file to create')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--movies', type=int)
+    parser.add_argument('--theaters', type=int)
+    parser.add_argument('--shows', type=int)
+    parser.add_argument('--bookings', type=int)
+    parser.add_argument('--days', type=int, default=90, help='days of shows (stretched if --shows needs more)')
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument('--start-date', type=date.fromisoformat,
+                       help=f'first show day, YYYY-MM-DD (default: {DEFAULT_START_DATE})')
+    start.add_argument('--relative-to-today', action='store_true',
+                       help='start shows 30 days ago; the database then depends on the run date')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='replace an existing file')
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    if args.force:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+
+    start_date = relative_start_date() if args.relative_to_today else args.start_date
+    result = generate(args.path, seed=args.seed, days=args.days, start_date=start_date, log=print, **sizes)
+    counts = ', '.join(f'{v} {k}' for k, v in result['counts'].items())
+    print(f"Created {args.path} in {result['timings']['total']}s: {counts}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,425 @@
+"""HTTP load test for the booking flow.
+
+Usage:
+    python loadtest.py --duration 30 --concurrency 16
+    python loadtest.py --rate 20 --duration 60 --db loadtest.db
+    python loadtest.py --url http://127.0.0.1:5000 --db movienight.db
+    python loadtest.py --scale medium --db loadtest_medium.db --rate 50
+
+Each simulated customer browses ``/``, opens ``/movie/<id>`` and
+``/book_seats/<id>`` and then POSTs ``/api/book_tickets`` with a few seats
+and food items. Without ``--rate`` every worker runs flows back to back
+(closed model); with ``--rate`` flows arrive as a Poisson process and
+latency is measured from the scheduled arrival, so queueing shows up in the
+numbers. Unless ``--url`` is given, the app is started on a free local port
+against ``--db``; with ``--scale`` a missing ``--db`` is first filled by
+``generate_dataset``.
+
+Afterwards the database is checked for seats sold twice and for drift
+between ``shows.available_seats`` and the bookings made during the run.
+The exit code is 1 if either check fails.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+import generate_dataset
+from seat_map import SeatMap, SEATS_PER_ROW
+
+ROUTES = ('GET /', 'GET /movie/<id>', 'GET /book_seats/<id>', 'POST /api/book_tickets')
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+class Fixtures:
+    """Movies, shows, capacities and food items read from the database before the run."""
+
+    def __init__(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            self.movie_ids = [r[0] for r in conn.execute('SELECT id FROM movies')]
+            self.shows = defaultdict(list)
+            self.capacity = {}
+            for show_id, movie_id, seats in conn.execute('''SELECT s.id, s.movie_id, t.total_seats FROM shows s
+                                                            LEFT JOIN theaters t ON s.theater_id = t.id'''):
+                self.shows[movie_id].append(show_id)
+                self.capacity[show_id] = SeatMap(seats).capacity
+            self.food_ids = [str(r[0]) for r in conn.execute('SELECT id FROM food_items')]
+        finally:
+            conn.close()
+        self.movie_ids = [m for m in self.movie_ids if self.shows.get(m)]
+        if not self.movie_ids:
+            raise SystemExit('No movies with shows in the database; run init_database first')
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.conflicts = 0
+        self.busy = 0
+        self.bookings = 0
+        self.flows = 0
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def booking(self, result):
+        with self._lock:
+            if result == 'booked':
+                self.bookings += 1
+            elif result == 'conflict':
+                self.conflicts += 1
+            elif result == 'busy':
+                self.busy += 1
+
+    def flow(self, seconds):
+        self.record('flow', seconds, True)
+        with self._lock:
+            self.flows += 1
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, path, payload=None):
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+class LoadTest:
+    def __init__(self, client, fixtures, stats, think=0.0, seed=None):
+        self.client = client
+        self.fixtures = fixtures
+        self.stats = stats
+        self.think = think
+        self._seed = seed
+        self._local = threading.local()
+
+    @property
+    def rng(self):
+        if not hasattr(self._local, 'rng'):
+            seed = None if self._seed is None else f'{self._seed}-{threading.current_thread().name}'
+            self._local.rng = random.Random(seed)
+        return self._local.rng
+
+    def _timed(self, route, path, payload=None):
+        started = time.perf_counter()
+        try:
+            status, body = self.client.request(path, payload)
+        except (urllib.error.URLError, OSError):
+            self.stats.record(route, time.perf_counter() - started, False)
+            return None, None
+        # 429 is the app shedding load on a busy show, not a failure
+        self.stats.record(route, time.perf_counter() - started, status < 400 or status == 429)
+        return status, body
+
+    def _pause(self):
+        if self.think:
+            time.sleep(self.rng.expovariate(1.0 / self.think))
+
+    def _pick_seats(self, show_id):
+        capacity = self.fixtures.capacity[show_id]
+        count = min(self.rng.randint(1, 4), SEATS_PER_ROW)
+        rows = (capacity + SEATS_PER_ROW - 1) // SEATS_PER_ROW
+        seat_map = SeatMap(capacity)
+        row = self.rng.randrange(rows)
+        row_size = min(SEATS_PER_ROW, capacity - row * SEATS_PER_ROW)
+        count = min(count, row_size)
+        start = row * SEATS_PER_ROW + self.rng.randint(0, row_size - count)
+        return [seat_map.label(idx) for idx in range(start, start + count)]
+
+    def _pick_food(self):
+        if not self.fixtures.food_ids or self.rng.random() < 0.4:
+            return {}, 0
+        items = {food_id: self.rng.randint(1, 2)
+                 for food_id in self.rng.sample(self.fixtures.food_ids, min(2, len(self.fixtures.food_ids)))}
+        return items, 150 * sum(items.values())
+
+    def run_flow(self):
+        rng = self.rng
+        movie_id = rng.choice(self.fixtures.movie_ids)
+        show_id = rng.choice(self.fixtures.shows[movie_id])
+
+        self._timed('GET /', '/')
+        self._pause()
+        self._timed('GET /movie/<id>', f'/movie/{movie_id}')
+        self._pause()
+        self._timed('GET /book_seats/<id>', f'/book_seats/{show_id}')
+        self._pause()
+
+        seats = self._pick_seats(show_id)
+        food_items, food_total = self._pick_food()
+        status, body = self._timed('POST /api/book_tickets', '/api/book_tickets', {
+            'show_id': show_id,
+            'customer_name': 'Load Test',
+            'customer_email': f'load{rng.randrange(10**6)}@example.com',
+            'customer_phone': '0000000000',
+            'selected_seats': seats,
+            'food_items': food_items,
+            'food_total': food_total,
+        })
+        if status == 429:
+            self.stats.booking('busy')
+        elif status == 200:
+            try:
+                result = json.loads(body)
+            except ValueError:
+                return
+            if result.get('success'):
+                self.stats.booking('booked')
+            elif result.get('conflict_seats'):
+                self.stats.booking('conflict')
+
+    def run_closed(self, concurrency, deadline, max_flows=None):
+        remaining = [max_flows]
+        lock = threading.Lock()
+
+        def worker():
+            while time.monotonic() < deadline:
+                with lock:
+                    if remaining[0] is not None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                started = time.perf_counter()
+                self.run_flow()
+                self.stats.flow(time.perf_counter() - started)
+
+        self._run_threads(worker, concurrency)
+
+    def run_open(self, concurrency, rate, deadline, max_flows=None):
+        arrivals = queue.Queue()
+
+        def worker():
+            while True:
+                scheduled = arrivals.get()
+                if scheduled is None:
+                    return
+                self.run_flow()
+                # Measured from the intended start so a backlog is not hidden
+                self.stats.flow(time.perf_counter() - scheduled)
+
+        threads = self._start_threads(worker, concurrency)
+        rng = random.Random(self._seed)
+        next_arrival = time.perf_counter()
+        sent = 0
+        while time.monotonic() < deadline and (max_flows is None or sent < max_flows):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put(next_arrival)
+            sent += 1
+            next_arrival += rng.expovariate(rate)
+        for _ in threads:
+            arrivals.put(None)
+        for t in threads:
+            t.join()
+
+    def _start_threads(self, target, count):
+        threads = [threading.Thread(target=target, name=f'loadtest-{i}', daemon=True) for i in range(count)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _run_threads(self, target, count):
+        for t in self._start_threads(target, count):
+            t.join()
+
+def snapshot(db_path):
+    """available_seats and booked seat counts per show, taken before the run."""
+    conn = sqlite3.connect(db_path)
+    try:
+        available = dict(conn.execute('SELECT id, available_seats FROM shows'))
+        booked = defaultdict(int)
+        for show_id, seat_numbers in conn.execute('SELECT show_id, seat_numbers FROM bookings'):
+            booked[show_id] += len(json.loads(seat_numbers or '[]'))
+        return available, booked
+    finally:
+        conn.close()
+
+def check_integrity(db_path, before):
+    """Seats sold twice, seat maps that disagree with bookings, and drift in available_seats or sold counters."""
+    available_before, booked_before = before
+    available_after, booked_after = snapshot(db_path)
+    problems = {'overbooked': [], 'seat_map_mismatch': [], 'available_drift': [], 'occupancy_drift': []}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        sold = defaultdict(list)
+        for show_id, seat_numbers in conn.execute('SELECT show_id, seat_numbers FROM bookings'):
+            sold[show_id].extend(json.loads(seat_numbers or '[]'))
+        seat_maps = {show_id: (capacity, blob) for show_id, capacity, blob
+                     in conn.execute('SELECT show_id, capacity, booked FROM seat_maps')}
+        occupancy = dict(conn.execute('SELECT show_id, sold FROM show_occupancy'))
+    finally:
+        conn.close()
+
+    for show_id, seats in sold.items():
+        seen = set()
+        doubled = sorted({s for s in seats if s in seen or seen.add(s)})
+        if doubled:
+            problems['overbooked'].append({'show_id': show_id, 'seats': doubled})
+        if show_id in seat_maps:
+            seat_map = SeatMap.from_blob(*seat_maps[show_id])
+            if set(seat_map) != seen:
+                problems['seat_map_mismatch'].append({'show_id': show_id, 'bookings': len(seen),
+                                                      'seat_map': seat_map.count()})
+        if occupancy.get(show_id, 0) != len(seats):
+            problems['occupancy_drift'].append({'show_id': show_id, 'bookings': len(seats),
+                                                'sold_counter': occupancy.get(show_id, 0)})
+
+    for show_id, after in available_after.items():
+        before_seats = available_before.get(show_id)
+        if before_seats is None:
+            continue
+        sold_during_run = booked_after.get(show_id, 0) - booked_before.get(show_id, 0)
+        if before_seats - after != sold_during_run:
+            problems['available_drift'].append({'show_id': show_id, 'available_before': before_seats,
+                                                'available_after': after, 'seats_sold': sold_during_run})
+    return problems
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(db_path, port, timeout=30):
+    env = dict(os.environ, SQLITE_PATH=db_path, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    proc = subprocess.Popen([sys.executable, '-c', code], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = Client(f'http://127.0.0.1:{port}', timeout=2)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'App exited with code {proc.returncode} during startup')
+        try:
+            client.request('/food-menu')
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit('App did not start in time')
+
+def report(stats, elapsed):
+    result = {'elapsed_seconds': round(elapsed, 2), 'flows': stats.flows, 'routes': {}}
+    for route in ROUTES + ('flow',):
+        latencies = sorted(stats.latencies.get(route, []))
+        if not latencies:
+            continue
+        result['routes'][route] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'error_rate': round(stats.errors.get(route, 0) / len(latencies), 4),
+        }
+    attempts = len(stats.latencies.get('POST /api/book_tickets', []))
+    result['bookings'] = {
+        'attempts': attempts,
+        'booked': stats.bookings,
+        'conflict_rate': round(stats.conflicts / attempts, 4) if attempts else 0.0,
+        'busy_rate': round(stats.busy / attempts, 4) if attempts else 0.0,
+    }
+    return result
+
+def print_report(result, problems):
+    print(f"{result['flows']} flows in {result['elapsed_seconds']}s")
+    print(f"{'route':<26}{'reqs':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for route, r in result['routes'].items():
+        print(f"{route:<26}{r['requests']:>8}{r['throughput_rps']:>9}{r['p50_ms']:>9}"
+              f"{r['p95_ms']:>9}{r['p99_ms']:>9}{r['error_rate']:>8.2%}")
+    b = result['bookings']
+    print(f"bookings: {b['booked']}/{b['attempts']} booked, conflict rate {b['conflict_rate']:.2%}, "
+          f"busy rate {b['busy_rate']:.2%}")
+    for name, found in problems.items():
+        print(f"{name}: {'OK' if not found else f'{len(found)} shows'}")
+        for item in found[:10]:
+            print(f'  {item}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the booking flow.')
+    parser.add_argument('--url', help='target a running app instead of starting one')
+    parser.add_argument('--db', default=os.environ.get('SQLITE_PATH', 'movienight.db'),
+                        help='database the app uses; checked after the run')
+    parser.add_argument('--scale', choices=generate_dataset.SCALES,
+                        help='generate --db at this scale first if it does not exist')
+    parser.add_argument('--concurrency', type=int, default=8, help='worker threads')
+    parser.add_argument('--rate', type=float, help='flow arrivals per second (open model)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds')
+    parser.add_argument('--flows', type=int, help='stop after this many flows')
+    parser.add_argument('--think', type=float, default=0.0, help='mean think time between steps, seconds')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout, seconds')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args(argv)
+
+    if args.scale and not os.path.exists(args.db):
+        # Live traffic needs upcoming shows, so anchor the dataset to today
+        generate_dataset.generate(args.db, start_date=generate_dataset.relative_start_date(),
+                                  **generate_dataset.SCALES[args.scale])
+
+    proc = None
+    if not args.url:
+        # The app creates and migrates the database on startup
+        port = free_port()
+        proc = start_server(args.db, port)
+        args.url = f'http://127.0.0.1:{port}'
+
+    try:
+        fixtures = Fixtures(args.db)
+        before = snapshot(args.db)
+        stats = Stats()
+        test = LoadTest(Client(args.url, args.timeout), fixtures, stats, args.think, args.seed)
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        if args.rate:
+            test.run_open(args.concurrency, args.rate, deadline, args.flows)
+        else:
+            test.run_closed(args.concurrency, deadline, args.flows)
+        elapsed = time.perf_counter() - started
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    result = report(stats, elapsed)
+    problems = check_integrity(args.db, before)
+    result['integrity'] = problems
+    print_report(result, problems)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 1 if any(problems.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
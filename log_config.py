@@ -0,0 +1,29 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+_listener = None
+
+def setup_logging(level='INFO'):
+    """Route all log records through a queue drained by a background thread.
+
+    Request threads only pay for a ``queue.put``; formatting and the
+    blocking write to stderr happen on the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
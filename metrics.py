@@ -0,0 +1,353 @@
+"""Prometheus metrics for the app, exposed at ``/metrics``.
+
+Recording is lock-free on the hot path: each thread increments its own
+shard, and shards are only summed when metrics are collected. A lock is
+taken once per new thread to register its shard, and that is also when the
+shards of finished threads are folded together.
+
+With several worker processes, set ``METRICS_DIR`` to a directory they all
+share. Each process writes a snapshot there every
+``METRICS_FLUSH_INTERVAL`` seconds (and whenever it serves ``/metrics``),
+and a scrape merges every snapshot. Counters and histograms from exited
+workers are kept; their gauges are dropped. Empty the directory on each
+deploy so snapshots from a previous release are not counted.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from config import Config
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+class _Metric:
+    def __init__(self, registry, name, help_text, labelnames, kind):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels[n]) for n in self.labelnames))
+
+class Counter(_Metric):
+    def __init__(self, registry, name, help_text, labelnames=()):
+        super().__init__(registry, name, help_text, labelnames, 'counter')
+
+    def inc(self, amount=1, **labels):
+        values = self.registry._shard().counters
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+class Histogram(_Metric):
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames, 'histogram')
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        values = self.registry._shard().histograms
+        key = self._key(labels)
+        counts = values.get(key)
+        if counts is None:
+            # One slot per bucket plus +Inf, then sum and count
+            counts = values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+class Gauge(_Metric):
+    """Set at collection time by a registered collector."""
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        super().__init__(registry, name, help_text, labelnames, 'gauge')
+
+class _Shard:
+    __slots__ = ('counters', 'histograms', 'thread', '__weakref__')
+
+    def __init__(self, thread=None):
+        self.counters = {}
+        self.histograms = {}
+        self.thread = weakref.ref(thread) if thread else None
+
+    def alive(self):
+        thread = self.thread and self.thread()
+        return thread is not None and thread.is_alive()
+
+    def merge_into(self, counters, histograms):
+        for key, value in list(self.counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, counts in list(self.histograms.items()):
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = list(counts)
+            else:
+                for i, value in enumerate(counts):
+                    total[i] += value
+
+class MetricsRegistry:
+    def __init__(self, metrics_dir=None, flush_interval=None):
+        self.metrics = {}
+        self.collectors = []
+        self.metrics_dir = Config.METRICS_DIR if metrics_dir is None else metrics_dir
+        self.flush_interval = Config.METRICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._fold_finished()
+                self._shards.append(shard)
+        return shard
+
+    def _fold_finished(self):
+        # Caller holds self._lock. Threads that have exited never write again.
+        live = []
+        for shard in self._shards:
+            if shard.alive():
+                live.append(shard)
+            else:
+                shard.merge_into(self._retired.counters, self._retired.histograms)
+        self._shards = live
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        return self._add(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(self, name, help_text, labelnames))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collect):
+        """``collect()`` returns ``{(metric_name, label_values): value}`` for gauges and scrape-time counters."""
+        self.collectors.append(collect)
+
+    def snapshot(self):
+        """This process's values, as plain dicts."""
+        counters, histograms = {}, {}
+        with self._lock:
+            self._fold_finished()
+            self._retired.merge_into(counters, histograms)
+            for shard in self._shards:
+                shard.merge_into(counters, histograms)
+        gauges = {}
+        for collect in self.collectors:
+            for key, value in collect().items():
+                metric = self.metrics.get(key[0])
+                if metric is not None and metric.kind == 'counter':
+                    counters[key] = counters.get(key, 0) + value
+                else:
+                    gauges[key] = value
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    # Multi-process support
+
+    def _path(self, pid):
+        return os.path.join(self.metrics_dir, f'metrics_{pid}.json')
+
+    def flush(self):
+        if not self.metrics_dir:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        snap = self.snapshot()
+        data = {kind: [[key[0], list(key[1]), value] for key, value in values.items()]
+                for kind, values in snap.items()}
+        path = self._path(os.getpid())
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def start_flusher(self):
+        if not self.metrics_dir or (self._flusher and self._flusher.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=run, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _load_all(self):
+        counters, histograms, gauges = {}, {}, {}
+        for name in os.listdir(self.metrics_dir):
+            match = re.fullmatch(r'metrics_(\d+)\.json', name)
+            if not match:
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(int(match.group(1)))
+            for metric, labels, value in data.get('counters', []):
+                key = (metric, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for metric, labels, counts in data.get('histograms', []):
+                key = (metric, tuple(labels))
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(counts)
+                elif len(total) == len(counts):
+                    for i, value in enumerate(counts):
+                        total[i] += value
+            if alive:
+                for metric, labels, value in data.get('gauges', []):
+                    key = (metric, tuple(labels))
+                    gauges[key] = gauges.get(key, 0) + value
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def collect(self):
+        if self.metrics_dir:
+            self.flush()
+            snap = self._load_all()
+        else:
+            snap = self.snapshot()
+        # Ratios are derived after merging; summing per-process ratios would be meaningless
+        lookups = {}
+        for (name, labels), value in snap['counters'].items():
+            if name == cache_requests.name:
+                cache, result = labels
+                lookups.setdefault(cache, {})[result] = value
+        for cache, counts in lookups.items():
+            total = sum(counts.values())
+            snap['gauges'][(cache_hit_ratio.name, (cache,))] = counts.get('hit', 0) / total if total else 0.0
+        return snap
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        snap = self.collect()
+        by_name = {}
+        for kind in ('counters', 'histograms', 'gauges'):
+            for key, value in snap[kind].items():
+                by_name.setdefault(key[0], []).append((key[1], value))
+
+        lines = []
+        for name in sorted(by_name):
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for label_values, value in sorted(by_name[name]):
+                labels = list(zip(metric.labelnames, label_values))
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-2]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+                lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+_SQL_NAME = re.compile(r'^\s*(?:WITH\b.*?\)\s*)?(SELECT|INSERT|UPDATE|DELETE|REPLACE|BEGIN|COMMIT|ROLLBACK|'
+                       r'SAVEPOINT|RELEASE|PRAGMA|CREATE|DROP|ANALYZE)\b', re.I | re.S)
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)', re.I)
+_query_names = {}
+MAX_QUERY_NAMES = 2048
+
+def query_name(sql):
+    """Stable low-cardinality name for a statement, e.g. ``select_shows``."""
+    name = _query_names.get(sql)
+    if name is None:
+        verb = _SQL_NAME.match(sql)
+        verb = verb.group(1).lower() if verb else 'other'
+        table = _SQL_TABLE.search(sql) if verb in ('select', 'insert', 'update', 'delete', 'replace') else None
+        name = f'{verb}_{table.group(1).lower()}' if table else verb
+        if len(_query_names) < MAX_QUERY_NAMES:
+            _query_names[sql] = name
+    return name
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter('movienight_http_requests_total', 'HTTP requests by endpoint, method and status',
+                                 ('endpoint', 'method', 'status'))
+http_latency = registry.histogram('movienight_http_request_duration_seconds', 'HTTP request latency by endpoint',
+                                  ('endpoint',))
+db_latency = registry.histogram('movienight_db_query_duration_seconds', 'SQLite statement latency by query name',
+                                ('query',), QUERY_BUCKETS)
+bookings = registry.counter('movienight_bookings_total', 'Booking attempts by outcome', ('result',))
+seats_booked = registry.counter('movienight_seats_booked_total', 'Seats sold')
+food_attachments = registry.counter('movienight_food_orders_attached_total', 'Bookings placed with a food order')
+pool_connections = registry.gauge('movienight_db_pool_connections', 'SQLite pool connections by state', ('state',))
+cache_requests = registry.counter('movienight_cache_requests_total', 'Cache lookups by cache and result',
+                                  ('cache', 'result'))
+cache_hit_ratio = registry.gauge('movienight_cache_hit_ratio', 'Cache hit ratio since start, per cache', ('cache',))
+writer_batches = registry.counter('movienight_booking_writer_batches_total', 'Group commits by the booking writer')
+writer_writes = registry.counter('movienight_booking_writer_writes_total', 'Writes committed by the booking writer')
+occupancy_repairs = registry.counter('movienight_occupancy_repairs_total',
+                                     'Shows whose occupancy counters were repaired by reconciliation')
+
+def observe_request(endpoint, method, status, seconds):
+    endpoint = endpoint or 'unmatched'
+    http_requests.inc(endpoint=endpoint, method=method, status=status)
+    http_latency.observe(seconds, endpoint=endpoint)
+
+def observe_query(sql, seconds):
+    db_latency.observe(seconds, query=query_name(sql))
+
+def _collect_app_stats():
+    # Imported here: simple_sqlite records queries through this module
+    import simple_sqlite as db
+    from page_cache import pages
+
+    pool = db.get_pool().stats()
+    catalog = db.catalog.stats()
+    page = pages.stats()
+    writer = db.writer.stats()
+    return {
+        (pool_connections.name, ('open',)): pool['opened'],
+        (pool_connections.name, ('idle',)): pool['idle'],
+        (pool_connections.name, ('max',)): pool['size'],
+        (cache_requests.name, ('catalog', 'hit')): catalog['hits'],
+        (cache_requests.name, ('catalog', 'miss')): catalog['misses'],
+        (cache_requests.name, ('pages', 'hit')): page['hits'],
+        (cache_requests.name, ('pages', 'miss')): page['misses'],
+        (writer_batches.name, ()): writer['batches'],
+        (writer_writes.name, ()): writer['writes'],
+    }
+
+registry.register_collector(_collect_app_stats)
@@ -0,0 +1,334 @@
+"""Schema migrations for the SQLite database.
+
+Each step runs once, in order, and the number of applied steps is kept in
+``PRAGMA user_version``. Steps must be idempotent (``IF NOT EXISTS``) so a
+database created before migrations existed upgrades cleanly. Append new
+steps to ``MIGRATIONS``; never reorder or edit a step that has shipped.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_core_tables(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        duration INTEGER,
+        genre TEXT,
+        language TEXT,
+        release_date TEXT,
+        image_url TEXT
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS theaters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        location TEXT,
+        total_seats INTEGER DEFAULT 100
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS shows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        movie_id INTEGER,
+        theater_id INTEGER,
+        show_date TEXT,
+        show_time TEXT,
+        price REAL,
+        available_seats INTEGER
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        show_id INTEGER,
+        customer_name TEXT,
+        customer_email TEXT,
+        customer_phone TEXT,
+        seat_numbers TEXT,
+        total_amount REAL,
+        booking_date TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS food_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        price REAL NOT NULL,
+        category TEXT NOT NULL
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS food_orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER,
+        items TEXT,
+        total_amount REAL,
+        discount_applied REAL DEFAULT 0
+    )''')
+
+    # One occupancy bitmap per show
+    cursor.execute('''CREATE TABLE IF NOT EXISTS seat_maps (
+        show_id INTEGER PRIMARY KEY,
+        capacity INTEGER NOT NULL,
+        booked BLOB NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+
+    # Short-lived seat reservations during checkout
+    cursor.execute('''CREATE TABLE IF NOT EXISTS seat_holds (
+        token TEXT PRIMARY KEY,
+        show_id INTEGER NOT NULL,
+        seats BLOB NOT NULL,
+        seat_numbers TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )''')
+
+def create_indexes(cursor):
+    # Movie page: shows for one movie in date order
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shows_movie ON shows (movie_id, show_date, show_time)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shows_theater ON shows (theater_id, show_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_show ON bookings (show_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (booking_date, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_food_orders_booking ON food_orders (booking_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_food_items_category ON food_items (category, name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_seat_holds_show ON seat_holds (show_id, expires_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_seat_holds_expires ON seat_holds (expires_at)')
+
+def seed_sample_data(cursor):
+    cursor.execute('SELECT COUNT(*) FROM movies')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('INSERT INTO movies (title, description, duration, genre, language, release_date, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)', [
+            ('Avengers: Endgame', 'Epic superhero finale', 181, 'Action', 'English', '2024-01-15', 'https://upload.wikimedia.org/wikipedia/en/0/0d/Avengers_Endgame_poster.jpg'),
+            ('Spider-Man', 'Friendly neighborhood hero', 148, 'Action', 'English', '2024-02-01', 'https://upload.wikimedia.org/wikipedia/en/2/21/Web_of_Spider-Man_Vol_1_129-1.png'),
+            ('The Dark Knight', 'Batman vs Joker', 152, 'Action', 'English', '2024-01-20', 'https://upload.wikimedia.org/wikipedia/en/1/1c/The_Dark_Knight_%282008_film%29.jpg')
+        ])
+
+    cursor.execute('SELECT COUNT(*) FROM theaters')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('INSERT INTO theaters (name, location, total_seats) VALUES (?, ?, ?)', [
+            ('PVR Cinemas', 'Mall Road', 96),
+            ('INOX Theater', 'City Center', 120),
+            ('Cineplex', 'Downtown', 80)
+        ])
+
+    cursor.execute('SELECT COUNT(*) FROM shows')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('INSERT INTO shows (movie_id, theater_id, show_date, show_time, price, available_seats) VALUES (?, ?, ?, ?, ?, ?)', [
+            (1, 1, '2024-12-25', '18:00', 250.0, 96),
+            (1, 2, '2024-12-25', '21:00', 300.0, 120),
+            (2, 1, '2024-12-26', '15:00', 200.0, 96),
+            (2, 3, '2024-12-26', '19:30', 220.0, 80),
+            (3, 2, '2024-12-27', '16:00', 280.0, 120),
+            (3, 3, '2024-12-27', '20:00', 260.0, 80)
+        ])
+
+    seed_food_menu(cursor)
+
+def seed_food_menu(cursor):
+    cursor.execute('SELECT COUNT(*) FROM food_items')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('INSERT INTO food_items (name, price, category) VALUES (?, ?, ?)', [
+            ('Popcorn (Small)', 150, 'Snacks'),
+            ('Popcorn (Large)', 250, 'Snacks'),
+            ('Nachos', 200, 'Snacks'),
+            ('Hot Dog', 180, 'Snacks'),
+            ('Coke (Small)', 80, 'Drinks'),
+            ('Coke (Large)', 120, 'Drinks'),
+            ('Water Bottle', 50, 'Drinks'),
+            ('Combo 1 (Popcorn + Coke)', 200, 'Combos'),
+            ('Combo 2 (Nachos + Coke)', 250, 'Combos')
+        ])
+
+def create_booking_listing_indexes(cursor):
+    # Admin bookings page: newest first, optionally narrowed to a show or customer
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_show_date ON bookings (show_id, booking_date, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_email_date ON bookings (customer_email, booking_date, id)')
+
+def create_seat_events(cursor):
+    # Append-only log of seat changes; seat_maps.version is the per-show sequence
+    cursor.execute('''CREATE TABLE IF NOT EXISTS seat_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        show_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        seats BLOB NOT NULL,
+        created_at REAL NOT NULL
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_seat_events_show ON seat_events (show_id, version)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_seat_events_created ON seat_events (created_at)')
+
+def create_occupancy_counters(cursor):
+    # Seat counts kept in step with seat_maps and seat_holds by the booking code
+    cursor.execute('''CREATE TABLE IF NOT EXISTS show_occupancy (
+        show_id INTEGER PRIMARY KEY,
+        theater_id INTEGER,
+        show_date TEXT,
+        capacity INTEGER NOT NULL,
+        sold INTEGER NOT NULL DEFAULT 0,
+        held INTEGER NOT NULL DEFAULT 0
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_show_occupancy_theater ON show_occupancy (theater_id, show_date)')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS theater_daily_sales (
+        theater_id INTEGER NOT NULL,
+        show_date TEXT NOT NULL,
+        seats_sold INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (theater_id, show_date)
+    ) WITHOUT ROWID''')
+
+    # Backfill from bookings and holds; capacity follows SeatMap (96 default, 26 rows of 12 at most)
+    cursor.execute('''INSERT OR IGNORE INTO show_occupancy (show_id, theater_id, show_date, capacity, sold, held)
+        SELECT s.id, s.theater_id, s.show_date,
+               COALESCE(m.capacity, MIN(COALESCE(NULLIF(t.total_seats, 0), 96), 312)),
+               (SELECT COALESCE(SUM(json_array_length(b.seat_numbers)), 0) FROM bookings b WHERE b.show_id = s.id),
+               (SELECT COALESCE(SUM(json_array_length(h.seat_numbers)), 0) FROM seat_holds h WHERE h.show_id = s.id)
+        FROM shows s
+        LEFT JOIN seat_maps m ON m.show_id = s.id
+        LEFT JOIN theaters t ON t.id = s.theater_id''')
+    cursor.execute('''INSERT OR IGNORE INTO theater_daily_sales (theater_id, show_date, seats_sold)
+        SELECT theater_id, show_date, SUM(sold) FROM show_occupancy
+        WHERE theater_id IS NOT NULL AND show_date IS NOT NULL
+        GROUP BY theater_id, show_date HAVING SUM(sold) > 0''')
+    cursor.execute('UPDATE shows SET available_seats = (SELECT MAX(capacity - sold, 0) FROM show_occupancy o WHERE o.show_id = shows.id)')
+
+def create_sales_rollup(cursor):
+    # Per sales day (UTC booking date) x movie x theater; food counts on its booking's row
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sales_rollup (
+        day TEXT NOT NULL,
+        movie_id INTEGER NOT NULL,
+        theater_id INTEGER NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        ticket_revenue REAL NOT NULL DEFAULT 0,
+        food_orders INTEGER NOT NULL DEFAULT 0,
+        food_revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, movie_id, theater_id)
+    ) WITHOUT ROWID''')
+    # Covering, so per-movie and per-theater reports never touch the table
+    measures = 'bookings, tickets, ticket_revenue, food_orders, food_revenue'
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_sales_rollup_movie ON sales_rollup (movie_id, day, {measures})')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_sales_rollup_theater ON sales_rollup (theater_id, day, {measures})')
+    cursor.execute('''INSERT OR IGNORE INTO sales_rollup
+        (day, movie_id, theater_id, bookings, tickets, ticket_revenue, food_orders, food_revenue)
+        SELECT date(b.booking_date), s.movie_id, s.theater_id, COUNT(*),
+               COALESCE(SUM(json_array_length(b.seat_numbers)), 0), COALESCE(SUM(b.total_amount), 0),
+               COALESCE(SUM(f.orders), 0), COALESCE(SUM(f.revenue), 0)
+        FROM bookings b
+        JOIN shows s ON s.id = b.show_id
+        LEFT JOIN (SELECT booking_id, COUNT(*) AS orders, SUM(total_amount) AS revenue
+                   FROM food_orders GROUP BY booking_id) f ON f.booking_id = b.id
+        GROUP BY date(b.booking_date), s.movie_id, s.theater_id''')
+
+def create_movie_search(cursor):
+    # External-content FTS5 index over movies, kept in step by triggers
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title, description, genre, language,
+        content='movies', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts (rowid, title, description, genre, language)
+        VALUES (new.id, new.title, new.description, new.genre, new.language);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description, genre, language)
+        VALUES ('delete', old.id, old.title, old.description, old.genre, old.language);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_update
+        AFTER UPDATE OF title, description, genre, language ON movies BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description, genre, language)
+        VALUES ('delete', old.id, old.title, old.description, old.genre, old.language);
+        INSERT INTO movies_fts (rowid, title, description, genre, language)
+        VALUES (new.id, new.title, new.description, new.genre, new.language);
+    END''')
+    cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+
+def create_movie_facets(cursor):
+    # Home page filters: genre, language and year counts group straight off these indexes
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movies_genre ON movies (genre)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movies_language ON movies (language)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movies_release ON movies (release_date)')
+    # One row per (movie, theater) with its last show date, so "showing in
+    # city/theater" facets group a few rows per movie instead of every show
+    cursor.execute('''CREATE TABLE IF NOT EXISTS movie_venues (
+        movie_id INTEGER NOT NULL,
+        theater_id INTEGER NOT NULL,
+        last_show_date TEXT NOT NULL,
+        PRIMARY KEY (movie_id, theater_id)
+    ) WITHOUT ROWID''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_movie_venues_theater ON movie_venues (theater_id, last_show_date)')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movie_venues_show_insert AFTER INSERT ON shows
+        WHEN new.movie_id IS NOT NULL AND new.theater_id IS NOT NULL AND new.show_date IS NOT NULL BEGIN
+        INSERT INTO movie_venues (movie_id, theater_id, last_show_date)
+        VALUES (new.movie_id, new.theater_id, new.show_date)
+        ON CONFLICT (movie_id, theater_id) DO UPDATE SET last_show_date = MAX(last_show_date, excluded.last_show_date);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movie_venues_show_delete AFTER DELETE ON shows BEGIN
+        DELETE FROM movie_venues WHERE movie_id = old.movie_id AND theater_id = old.theater_id;
+        INSERT INTO movie_venues (movie_id, theater_id, last_show_date)
+        SELECT movie_id, theater_id, MAX(show_date) FROM shows
+        WHERE movie_id = old.movie_id AND theater_id = old.theater_id AND show_date IS NOT NULL
+        GROUP BY movie_id, theater_id;
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movie_venues_show_update
+        AFTER UPDATE OF movie_id, theater_id, show_date ON shows BEGIN
+        DELETE FROM movie_venues WHERE movie_id IN (old.movie_id, new.movie_id)
+                                   AND theater_id IN (old.theater_id, new.theater_id);
+        INSERT INTO movie_venues (movie_id, theater_id, last_show_date)
+        SELECT movie_id, theater_id, MAX(show_date) FROM shows
+        WHERE movie_id IN (old.movie_id, new.movie_id) AND theater_id IN (old.theater_id, new.theater_id)
+          AND show_date IS NOT NULL
+        GROUP BY movie_id, theater_id;
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS movie_venues_movie_delete AFTER DELETE ON movies BEGIN
+        DELETE FROM movie_venues WHERE movie_id = old.id;
+    END''')
+    cursor.execute('''INSERT OR REPLACE INTO movie_venues (movie_id, theater_id, last_show_date)
+                      SELECT movie_id, theater_id, MAX(show_date) FROM shows
+                      WHERE movie_id IS NOT NULL AND theater_id IS NOT NULL AND show_date IS NOT NULL
+                      GROUP BY movie_id, theater_id''')
+
+def create_show_listing_index(cursor):
+    # Admin shows page: date-ordered keyset pages from a date window
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shows_date_time ON shows (show_date, show_time, id)')
+
+MIGRATIONS = [
+    ('create core tables', create_core_tables),
+    ('create indexes for hot queries', create_indexes),
+    ('seed sample data', seed_sample_data),
+    ('create booking listing indexes', create_booking_listing_indexes),
+    ('create seat events log', create_seat_events),
+    ('create occupancy counters', create_occupancy_counters),
+    ('create sales rollup', create_sales_rollup),
+    ('create movie search index', create_movie_search),
+    ('create movie facets', create_movie_facets),
+    ('create show listing index', create_show_listing_index),
+]
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn, sample_data=True):
+    """Apply pending migrations and return the schema version.
+
+    A current database costs one ``PRAGMA user_version`` read. With
+    ``sample_data=False`` the seed step adds only the food menu, not the
+    demo movies, theaters and shows.
+    """
+    version = current_version(conn)
+    if version >= len(MIGRATIONS):
+        return version
+
+    # Serialize concurrent workers starting up against the same file
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = current_version(conn)
+        cursor = conn.cursor()
+        for number, (description, step) in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info('Applying migration %d: %s', number, description)
+            if step is seed_sample_data and not sample_data:
+                step = seed_food_menu
+            step(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return current_version(conn)
@@ -0,0 +1,99 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from config import Config
+from catalog_cache import catalog
+import simple_sqlite as db
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation: ``'Amélie (2001)'`` -> ``'amelie 2001'``."""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', text))
+
+class PrefixIndex:
+    """Sorted ``(key, movie_id, title)`` entries answering prefix lookups by bisection."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries)
+        self.keys = [entry[0] for entry in self.entries]
+
+    def lookup(self, prefix, limit, seen):
+        results = []
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(results) < limit and self.keys[i].startswith(prefix):
+            _, movie_id, title = self.entries[i]
+            if movie_id not in seen:
+                seen.add(movie_id)
+                results.append({'id': movie_id, 'title': title})
+            i += 1
+        return results
+
+    def __len__(self):
+        return len(self.keys)
+
+class MovieSuggester:
+    """Title typeahead served from memory.
+
+    Titles are matched from their first word, then from any later word
+    ("end" finds "Avengers: Endgame"). The index is rebuilt when this
+    process invalidates the movie catalog, and at least every
+    ``SEARCH_SUGGEST_MAX_AGE`` seconds to pick up other workers' changes.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = Config.SEARCH_SUGGEST_MAX_AGE if max_age is None else max_age
+        self._titles = None
+        self._words = None
+        self._version = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _stale(self, version):
+        return (self._titles is None or version != self._version
+                or time.monotonic() - self._built_at > self.max_age)
+
+    def _indexes(self):
+        version = catalog.version(('movies',))
+        if self._stale(version):
+            with self._lock:
+                if self._stale(version):
+                    self._build(version)
+        return self._titles, self._words
+
+    def _build(self, version):
+        titles = []
+        words = []
+        for movie_id, title in db.get_movie_titles():
+            parts = normalize(title).split(' ')
+            titles.append((' '.join(parts), movie_id, title))
+            for i in range(1, len(parts)):
+                words.append((' '.join(parts[i:]), movie_id, title))
+        # Readers swap to the new pair without locking
+        self._titles, self._words = PrefixIndex(titles), PrefixIndex(words)
+        self._version = version
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        titles, words = self._indexes()
+        seen = set()
+        results = titles.lookup(prefix, limit, seen)
+        if len(results) < limit:
+            results += words.lookup(prefix, limit - len(results), seen)
+        return results
+
+    def stats(self):
+        return {
+            'titles': len(self._titles) if self._titles else 0,
+            'word_keys': len(self._words) if self._words else 0,
+            'rebuilds': self.rebuilds,
+        }
+
+suggester = MovieSuggester()
@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+from config import Config
+import metrics
+import simple_sqlite as db
+
+logger = logging.getLogger(__name__)
+
+class OccupancyReconciler:
+    """Background pass that keeps the occupancy counters honest.
+
+    ``show_occupancy`` and ``theater_daily_sales`` are updated in the same
+    transaction as every seat change, so they only drift through manual
+    edits, old code paths or bugs. Every ``OCCUPANCY_RECONCILE_INTERVAL``
+    seconds they are recounted from ``seat_maps`` and ``seat_holds`` and any
+    difference is repaired and logged.
+    """
+
+    def __init__(self, interval=None, chunk_size=None):
+        self.interval = Config.OCCUPANCY_RECONCILE_INTERVAL if interval is None else interval
+        self.chunk_size = chunk_size or Config.OCCUPANCY_RECONCILE_CHUNK
+        self.last_result = None
+        self._thread = None
+
+    def run_once(self):
+        started = time.perf_counter()
+        result = db.reconcile_occupancy(self.chunk_size)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        if result['repaired'] or result['days_repaired']:
+            logger.warning('Occupancy drift repaired: %d shows, %d theater days',
+                           result['repaired'], result['days_repaired'])
+        metrics.occupancy_repairs.inc(result['repaired'])
+        self.last_result = result
+        return result
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.run_once()
+                except Exception:
+                    logger.exception('Occupancy reconciliation failed')
+
+        self._thread = threading.Thread(target=run, name='occupancy-reconcile', daemon=True)
+        self._thread.start()
+
+reconciler = OccupancyReconciler()
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response
+from config import Config
+from catalog_cache import catalog
+
+class PageCache:
+    """Full-response cache for public pages that only depend on the catalog.
+
+    Each entry remembers the catalog versions it was rendered from
+    (``catalog.version`` of every dependency key). While those versions are
+    unchanged and the entry is younger than the TTL, requests are answered
+    from memory, and a matching ``If-None-Match``/``If-Modified-Since``
+    gets a 304 without touching SQLite or Jinja. ETags are a hash of the
+    body, so they agree across worker processes.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = Config.PAGE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.PAGE_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _lookup(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['versions'] == versions and entry['expires'] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def _store(self, key, versions, response):
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            previous = self._entries.get(key)
+            # Unchanged content keeps its original Last-Modified
+            if previous and previous['etag'] == etag:
+                last_modified = previous['last_modified']
+            else:
+                last_modified = time.time()
+            entry = {
+                'versions': versions, 'etag': etag, 'body': body,
+                'mimetype': response.mimetype, 'last_modified': last_modified,
+                'expires': time.monotonic() + self.ttl,
+            }
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _respond(self, entry, response=None):
+        if response is None:
+            response = make_response(entry['body'])
+            response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        response.last_modified = entry['last_modified']
+        response.headers['Cache-Control'] = 'no-cache'
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def cached_page(self, dependencies):
+        """Cache a GET view; ``dependencies(**view_args)`` lists catalog keys."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                # Flash messages are per-user, so never serve or store them
+                if self.ttl <= 0 or request.method != 'GET' or session.get('_flashes'):
+                    return view(**view_args)
+
+                key = (request.endpoint, tuple(sorted(view_args.items())), request.query_string)
+                versions = tuple(catalog.version(dep) for dep in dependencies(**view_args))
+
+                entry = self._lookup(key, versions)
+                if entry is not None:
+                    self.hits += 1
+                    return self._respond(entry)
+
+                self.misses += 1
+                response = make_response(view(**view_args))
+                if response.status_code != 200:
+                    return response
+                return self._respond(self._store(key, versions, response), response)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+pages = PageCache()
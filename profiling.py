@@ -0,0 +1,128 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from flask import before_render_template, template_rendered
+from config import Config
+import simple_sqlite as db
+
+_timing = threading.local()
+
+def _template_started(sender, template, context, **extra):
+    _timing.template_started = time.perf_counter()
+
+def _template_finished(sender, template, context, **extra):
+    started = getattr(_timing, 'template_started', None)
+    if started is not None:
+        _timing.template_seconds = getattr(_timing, 'template_seconds', 0.0) + time.perf_counter() - started
+        _timing.template_started = None
+
+def get_template_time():
+    return getattr(_timing, 'template_seconds', 0.0)
+
+class ProfilingMiddleware:
+    """WSGI middleware that breaks each request's wall time down.
+
+    Every response gets a ``Server-Timing`` header with DB time and query
+    count, Jinja render time and the remainder spent in Python (routing,
+    controllers, serialization). A request is also run under cProfile when
+    it carries ``X-Profile: <PROFILE_TOKEN>`` or is picked by
+    ``PROFILE_SAMPLE_RATE``; the stats are written to ``PROFILE_DIR``.
+    """
+
+    def __init__(self, wsgi_app, profile_dir=None, token=None, sample_rate=None, max_files=None):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir or Config.PROFILE_DIR
+        self.token = Config.PROFILE_TOKEN if token is None else token
+        self.sample_rate = Config.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.max_files = max_files or Config.PROFILE_MAX_FILES
+        self._prune_lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        before_render_template.connect(_template_started, app)
+        template_rendered.connect(_template_finished, app)
+        app.wsgi_app = cls(app.wsgi_app)
+        return app.wsgi_app
+
+    def _should_profile(self, environ):
+        if self.token and environ.get('HTTP_X_PROFILE') == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        db.reset_query_stats()
+        _timing.template_seconds = 0.0
+        started = time.perf_counter()
+
+        def timed_start_response(status, headers, exc_info=None):
+            elapsed = time.perf_counter() - started
+            queries, db_seconds = db.get_query_stats()
+            template_seconds = get_template_time()
+            python_seconds = max(0.0, elapsed - db_seconds - template_seconds)
+            headers.append(('Server-Timing',
+                            f'db;dur={db_seconds * 1000:.2f};desc="{queries} queries", '
+                            f'tpl;dur={template_seconds * 1000:.2f}, '
+                            f'app;dur={python_seconds * 1000:.2f}, '
+                            f'total;dur={elapsed * 1000:.2f}'))
+            return start_response(status, headers, exc_info)
+
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, timed_start_response)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            # Consume the body inside the profile so lazy responses count too
+            body = list(self.wsgi_app(environ, timed_start_response))
+        finally:
+            profiler.disable()
+            self._save(profiler, environ, time.perf_counter() - started)
+        return body
+
+    def _save(self, profiler, environ, elapsed):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '/')).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-" \
+               f"{environ.get('REQUEST_METHOD', 'GET')}-{path[:60]}-{elapsed * 1000:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+        self._prune()
+
+    def _prune(self):
+        with self._prune_lock:
+            files = list_profiles(self.profile_dir)
+            for entry in files[self.max_files:]:
+                try:
+                    os.remove(os.path.join(self.profile_dir, entry['name']))
+                except OSError:
+                    pass
+
+def list_profiles(profile_dir=None):
+    """Saved profiles, newest first."""
+    profile_dir = profile_dir or Config.PROFILE_DIR
+    try:
+        names = [n for n in os.listdir(profile_dir) if n.endswith('.prof')]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        stat = os.stat(os.path.join(profile_dir, name))
+        match = re.search(r'-(\d+)ms\.prof$', name)
+        profiles.append({
+            'name': name,
+            'size': stat.st_size,
+            'created': stat.st_mtime,
+            'duration_ms': int(match.group(1)) if match else None,
+        })
+    profiles.sort(key=lambda p: p['name'], reverse=True)
+    return profiles
+
+def profile_path(name, profile_dir=None):
+    """Absolute path of a saved profile, or None for unknown or unsafe names."""
+    profile_dir = os.path.abspath(profile_dir or Config.PROFILE_DIR)
+    if os.path.basename(name) != name or not name.endswith('.prof'):
+        return None
+    path = os.path.join(profile_dir, name)
+    return path if os.path.isfile(path) else None
@@ -1,5 +1,6 @@
 from flask import Blueprint
-from controllers import MovieController, BookingController, ReviewController, AdminController, DatabaseController, FoodController
+from controllers import MovieController, BookingController, ReviewController, AdminController, DatabaseController, FoodController, MetricsController
+from page_cache import pages
 
 # Create blueprints
 main_bp = Blueprint('main', __name__)
@@ -8,10 +9,12 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # Main routes
 @main_bp.route('/')
+@pages.cached_page(lambda: [('movies',), ('facets',)])
 def index():
     return MovieController.index()
 
 @main_bp.route('/movie/<int:movie_id>')
+@pages.cached_page(lambda movie_id: [('movie', movie_id), ('shows_by_movie', movie_id)])
 def movie_details(movie_id):
     return MovieController.details(movie_id)
 
@@ -38,9 +41,14 @@ def razorpay_payment():
 
 
 @main_bp.route('/movies')
+@pages.cached_page(lambda: [('movies',), ('facets',)])
 def movies():
     return MovieController.index()
 
+@main_bp.route('/metrics')
+def metrics():
+    return MetricsController.metrics()
+
 @main_bp.route('/init-db')
 def init_db():
     return DatabaseController.init_db()
@@ -50,14 +58,40 @@ def update_images():
     return DatabaseController.update_images()
 
 @main_bp.route('/food-menu')
+@pages.cached_page(lambda: [('food_items',)])
 def food_menu():
     return FoodController.food_menu()
 
 # API routes
+@api_bp.route('/movies')
+@pages.cached_page(lambda: [('movies',), ('facets',)])
+def list_movies():
+    return MovieController.list_movies()
+
+@api_bp.route('/search')
+def search():
+    return MovieController.search()
+
+@api_bp.route('/suggest')
+def suggest():
+    return MovieController.suggest()
+
 @api_bp.route('/book_tickets', methods=['POST'])
 def book_tickets():
     return BookingController.create_booking()
 
+@api_bp.route('/shows/<int:show_id>/availability')
+def seat_availability(show_id):
+    return BookingController.availability(show_id)
+
+@api_bp.route('/holds', methods=['POST'])
+def place_hold():
+    return BookingController.place_hold()
+
+@api_bp.route('/holds/<hold_id>', methods=['DELETE'])
+def release_hold(hold_id):
+    return BookingController.release_hold(hold_id)
+
 @api_bp.route('/add_review', methods=['POST'])
 def add_review():
     return ReviewController.add_review()
@@ -87,6 +121,30 @@ def admin_shows():
 def admin_bookings():
     return AdminController.bookings()
 
+@admin_bp.route('/cache_stats')
+def cache_stats():
+    return AdminController.cache_stats()
+
+@admin_bp.route('/api/analytics')
+def analytics():
+    return AdminController.analytics()
+
+@admin_bp.route('/api/analytics/rebuild', methods=['POST'])
+def rebuild_analytics():
+    return AdminController.rebuild_analytics()
+
+@admin_bp.route('/reconcile_occupancy', methods=['POST'])
+def reconcile_occupancy():
+    return AdminController.reconcile_occupancy()
+
+@admin_bp.route('/profiles')
+def profiles():
+    return AdminController.profiles()
+
+@admin_bp.route('/profiles/<name>')
+def profile_detail(name):
+    return AdminController.profile_detail(name)
+
 @admin_bp.route('/add_movie', methods=['POST'])
 def add_movie():
     return AdminController.add_movie()
@@ -99,6 +157,14 @@ def add_theater():
 def add_show():
     return AdminController.add_show()
 
+@admin_bp.route('/schedule_shows', methods=['POST'])
+def schedule_shows():
+    return AdminController.schedule_shows()
+
+@admin_bp.route('/import', methods=['POST'])
+def import_catalog():
+    return AdminController.import_catalog()
+
 @admin_bp.route('/delete_movie', methods=['POST'])
 def delete_movie():
     return AdminController.delete_movie()
\ No newline at end of file
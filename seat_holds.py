@@ -0,0 +1,58 @@
+import heapq
+import secrets
+import threading
+import time
+from config import Config
+import simple_sqlite as db
+
+class SeatHoldManager:
+    """Time-limited seat holds placed while a customer is checking out.
+
+    Holds live in the ``seat_holds`` table so they survive a restart and are
+    visible to every worker; every availability check filters on
+    ``expires_at``, so an expired hold stops blocking seats immediately.
+    The in-memory heap only decides when to delete expired rows, which
+    happens lazily on the next hold operation.
+    """
+
+    def __init__(self, ttl=None, max_seats=None):
+        self.ttl = ttl or Config.SEAT_HOLD_TTL_SECONDS
+        self.max_seats = max_seats or Config.SEAT_HOLD_MAX_SEATS
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            self._heap = [(expires_at, token) for token, expires_at in db.get_active_seat_holds()]
+            heapq.heapify(self._heap)
+        self.expire()
+
+    def expire(self, now=None):
+        now = now or time.time()
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expired.append(heapq.heappop(self._heap)[1])
+        if expired:
+            db.delete_seat_holds(expired, expired_before=now)
+        return len(expired)
+
+    def place(self, show_id, seats, ttl=None):
+        if not seats:
+            raise ValueError('No seats selected')
+        if len(seats) > self.max_seats:
+            raise ValueError(f'You can hold at most {self.max_seats} seats')
+
+        self.expire()
+        token = secrets.token_urlsafe(16)
+        expires_at = time.time() + (ttl or self.ttl)
+        db.add_seat_hold(token, show_id, list(seats), expires_at)
+
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, token))
+        return {'hold_id': token, 'show_id': show_id, 'seats': list(seats), 'expires_at': expires_at}
+
+    def release(self, token):
+        return db.delete_seat_holds([token]) > 0
+
+holds = SeatHoldManager()
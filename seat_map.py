@@ -0,0 +1,98 @@
+SEATS_PER_ROW = 12
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+DEFAULT_CAPACITY = 96
+
+class SeatConflictError(Exception):
+    def __init__(self, seats):
+        self.seats = list(seats)
+        super().__init__(f"Seats already taken: {', '.join(self.seats)}")
+
+class SeatMap:
+    """Occupancy bitmap for one show.
+
+    Seats are numbered row-major, ``SEATS_PER_ROW`` to a row, so seat ``A1``
+    is bit 0 and ``B1`` is bit 12. The bitmap is stored in SQLite as a
+    little-endian BLOB of ``ceil(capacity / 8)`` bytes.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, bits=0):
+        self.capacity = min(int(capacity or DEFAULT_CAPACITY), SEATS_PER_ROW * len(ROW_LABELS))
+        self.bits = bits
+
+    @classmethod
+    def from_blob(cls, capacity, blob):
+        return cls(capacity, int.from_bytes(blob or b'', 'little'))
+
+    def to_blob(self):
+        return self.bits.to_bytes((self.capacity + 7) // 8, 'little')
+
+    def index(self, seat_id):
+        seat_id = str(seat_id).strip().upper()
+        try:
+            row = ROW_LABELS.index(seat_id[0])
+            num = int(seat_id[1:])
+        except (IndexError, ValueError):
+            raise ValueError(f'Invalid seat: {seat_id}')
+        idx = row * SEATS_PER_ROW + num - 1
+        if not 1 <= num <= SEATS_PER_ROW or idx >= self.capacity:
+            raise ValueError(f'Invalid seat: {seat_id}')
+        return idx
+
+    def label(self, idx):
+        return f'{ROW_LABELS[idx // SEATS_PER_ROW]}{idx % SEATS_PER_ROW + 1}'
+
+    def mask(self, seat_ids):
+        mask = 0
+        for seat_id in seat_ids:
+            bit = 1 << self.index(seat_id)
+            if mask & bit:
+                raise ValueError(f'Duplicate seat: {seat_id}')
+            mask |= bit
+        return mask
+
+    def labels(self, mask):
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.label(low.bit_length() - 1))
+            mask ^= low
+        return result
+
+    def conflicts(self, seat_ids):
+        return self.labels(self.bits & self.mask(seat_ids))
+
+    def book(self, seat_ids):
+        mask = self.mask(seat_ids)
+        taken = self.bits & mask
+        if taken:
+            raise SeatConflictError(self.labels(taken))
+        self.bits |= mask
+
+    def release(self, seat_ids):
+        self.bits &= ~self.mask(seat_ids)
+
+    def count(self):
+        return self.bits.bit_count()
+
+    def rows(self):
+        rows = []
+        for start in range(0, self.capacity, SEATS_PER_ROW):
+            seats = [(idx - start + 1, self.label(idx))
+                     for idx in range(start, min(start + SEATS_PER_ROW, self.capacity))]
+            rows.append((ROW_LABELS[start // SEATS_PER_ROW], seats))
+        return rows
+
+    def __contains__(self, seat_id):
+        try:
+            return bool(self.bits >> self.index(seat_id) & 1)
+        except ValueError:
+            return False
+
+    def __iter__(self):
+        return iter(self.labels(self.bits))
+
+    def __len__(self):
+        return self.count()
+
+    def __repr__(self):
+        return f'SeatMap(capacity={self.capacity}, booked={self.labels(self.bits)})'
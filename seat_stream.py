@@ -0,0 +1,208 @@
+"""Live seat-map updates over Server-Sent Events.
+
+Usage:
+    python seat_stream.py --port 5001
+
+Flask's WSGI server spends a thread on every open connection, which does not
+scale to thousands of people watching one premiere. This is a separate
+asyncio server for ``GET /api/shows/<id>/events``: idle streams cost a
+socket and a small queue, not a thread.
+
+The database is the message bus. One dispatcher polls ``seat_events`` (a
+primary-key range scan) and fans each new event out to the subscribers of
+that show, so bookings from any number of app workers are picked up. Each
+event carries its ``seat_events.id``; a reconnecting EventSource sends it
+back as ``Last-Event-ID`` and the missed events are replayed. If they have
+already been pruned the client gets a ``reset`` event and should re-fetch
+``/api/shows/<id>/availability``. Comment heartbeats keep proxies from
+closing idle streams.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+import simple_sqlite as db
+from seat_map import SeatMap
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r'^/api/shows/(\d+)/events$')
+BATCH = 500
+# Labels depend only on the bit index, so one map serves every show
+_LABELS = SeatMap()
+
+def format_event(event_id, show_id, version, kind, mask):
+    data = json.dumps({'show_id': show_id, 'version': version, 'kind': kind, 'seats': _LABELS.labels(mask)})
+    return f'id: {event_id}\nevent: seats\ndata: {data}\n\n'.encode()
+
+class SeatStreamHub:
+    def __init__(self, poll_interval=None, heartbeat=None, queue_size=None):
+        self.poll_interval = Config.SEAT_STREAM_POLL_MS / 1000.0 if poll_interval is None else poll_interval
+        self.heartbeat = Config.SEAT_STREAM_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+        self.queue_size = queue_size or Config.SEAT_STREAM_QUEUE_SIZE
+        self.subscribers = {}
+        self.last_id = 0
+        # SQLite calls run off the event loop, one at a time
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix='seat-stream-db')
+        self.events_sent = 0
+        self.dropped = 0
+
+    async def _query(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db, func, *args)
+
+    def subscribe(self, show_id):
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.setdefault(show_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, show_id, queue):
+        queues = self.subscribers.get(show_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[show_id]
+
+    def publish(self, show_id, message):
+        for queue in list(self.subscribers.get(show_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind is cut off; it reconnects and replays from Last-Event-ID
+                self.dropped += 1
+                self.unsubscribe(show_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def dispatch(self):
+        _, newest = await self._query(db.get_seat_event_bounds)
+        self.last_id = newest or 0
+        while True:
+            try:
+                events = await self._query(db.get_seat_events, self.last_id, None, BATCH)
+            except Exception:
+                logger.exception('Polling seat events failed')
+                events = []
+            for event_id, show_id, version, kind, mask in events:
+                self.last_id = event_id
+                if show_id in self.subscribers:
+                    self.publish(show_id, format_event(event_id, show_id, version, kind, mask))
+                    self.events_sent += 1
+            if len(events) < BATCH:
+                await asyncio.sleep(self.poll_interval)
+
+    async def heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for show_id in list(self.subscribers):
+                self.publish(show_id, b': ping\n\n')
+
+    async def replay(self, show_id, last_event_id):
+        """Messages a resuming client missed, or a reset if the log no longer has them."""
+        oldest, _ = await self._query(db.get_seat_event_bounds)
+        if oldest is None or last_event_id < oldest - 1:
+            return [b'event: reset\ndata: {}\n\n']
+        messages = []
+        after = last_event_id
+        while after < self.last_id:
+            events = await self._query(db.get_seat_events, after, show_id, BATCH)
+            events = [e for e in events if e[0] <= self.last_id]
+            if not events:
+                break
+            messages.extend(format_event(*event) for event in events)
+            after = events[-1][0]
+        return messages
+
+    async def handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode('latin-1').split('\r\n')
+        method, target = (lines[0].split(' ') + [''])[:2]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        path, _, query = target.partition('?')
+        match = PATH.match(path)
+        if method != 'GET' or not match:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        show_id = int(match.group(1))
+        last_event_id = headers.get('last-event-id') or _query_param(query, 'last_event_id')
+        queue = self.subscribe(show_id)
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: text/event-stream\r\n'
+                         b'Cache-Control: no-cache\r\n'
+                         b'Connection: keep-alive\r\n'
+                         b'X-Accel-Buffering: no\r\n'
+                         + f'Access-Control-Allow-Origin: {Config.SEAT_STREAM_ALLOW_ORIGIN}\r\n\r\n'.encode()
+                         + b'retry: 3000\n\n')
+            if last_event_id and last_event_id.isdigit():
+                for message in await self.replay(show_id, int(last_event_id)):
+                    writer.write(message)
+            await writer.drain()
+
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                writer.write(message)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.unsubscribe(show_id, queue)
+            writer.close()
+
+    def stats(self):
+        return {
+            'shows': len(self.subscribers),
+            'connections': sum(len(q) for q in self.subscribers.values()),
+            'events_sent': self.events_sent,
+            'dropped': self.dropped,
+            'last_event_id': self.last_id,
+        }
+
+def _query_param(query, name):
+    for part in query.split('&'):
+        key, _, value = part.partition('=')
+        if key == name:
+            return value
+    return None
+
+async def serve(host, port):
+    hub = SeatStreamHub()
+    server = await asyncio.start_server(hub.handle, host, port, backlog=1024)
+    logger.info('Seat stream listening on %s:%s', host, port)
+    async with server:
+        await asyncio.gather(server.serve_forever(), hub.dispatch(), hub.heartbeats())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve live seat-map updates over SSE.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args(argv)
+
+    from log_config import setup_logging
+    setup_logging(Config.LOG_LEVEL)
+    db.init_database()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
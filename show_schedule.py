@@ -0,0 +1,110 @@
+from datetime import date, datetime, timedelta
+import simple_sqlite as db
+
+MAX_SHOWS_PER_SCHEDULE = 50000
+
+class PriceTemplate:
+    """Ticket price for a slot: a base price, optional per-slot prices and a weekend surcharge."""
+
+    def __init__(self, base, slot_prices=None, weekend_surcharge=0):
+        self.base = float(base)
+        self.slot_prices = {normalize_time(k): float(v) for k, v in (slot_prices or {}).items()}
+        self.weekend_surcharge = float(weekend_surcharge or 0)
+        if self.base < 0 or self.weekend_surcharge < 0 or any(p < 0 for p in self.slot_prices.values()):
+            raise ValueError('Prices must not be negative')
+
+    @classmethod
+    def parse_slot_prices(cls, text):
+        # "21:00=300, 23:30=280"
+        prices = {}
+        for part in (text or '').replace(';', ',').split(','):
+            if not part.strip():
+                continue
+            slot, _, price = part.partition('=')
+            if not price:
+                raise ValueError(f'Invalid slot price: {part.strip()}')
+            prices[slot.strip()] = price.strip()
+        return prices
+
+    def price(self, show_date, slot):
+        price = self.slot_prices.get(slot, self.base)
+        if show_date.weekday() >= 5:
+            price += self.weekend_surcharge
+        return price
+
+def normalize_time(value):
+    value = str(value).strip()
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%H:%M')
+        except ValueError:
+            pass
+    raise ValueError(f'Invalid time slot: {value}')
+
+def parse_time_slots(value):
+    if isinstance(value, str):
+        value = value.replace(';', ',').split(',')
+    slots = sorted({normalize_time(v) for v in value if str(v).strip()})
+    if not slots:
+        raise ValueError('At least one time slot is required')
+    return slots
+
+def _as_date(value):
+    return value if isinstance(value, date) else datetime.strptime(value, '%Y-%m-%d').date()
+
+def expand_schedule(movie_id, theater_capacities, start_date, end_date, time_slots, price_template, weekdays=None):
+    """Every (theater, day, slot) combination as a show row ready for add_shows_bulk."""
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    if end_date < start_date:
+        raise ValueError('End date is before start date')
+
+    days = (end_date - start_date).days + 1
+    total = days * len(theater_capacities) * len(time_slots)
+    if total > MAX_SHOWS_PER_SCHEDULE:
+        raise ValueError(f'Schedule would create {total} shows; the limit is {MAX_SHOWS_PER_SCHEDULE}')
+
+    rows = []
+    for offset in range(days):
+        show_date = start_date + timedelta(days=offset)
+        if weekdays is not None and show_date.weekday() not in weekdays:
+            continue
+        iso_date = show_date.isoformat()
+        for theater_id, capacity in theater_capacities.items():
+            for slot in time_slots:
+                rows.append((movie_id, theater_id, iso_date, slot,
+                             price_template.price(show_date, slot), capacity))
+    return rows
+
+def generate_schedule(movie_id, theater_ids, start_date, end_date, time_slots, price_template,
+                      weekdays=None, preview=False):
+    """Expand a recurring schedule and insert it in one transaction.
+
+    Slots that already have a show in that theater are skipped. With
+    ``preview=True`` nothing is written; the result lists what would be.
+    """
+    if not db.get_movie_by_id(movie_id):
+        raise ValueError('Movie not found')
+
+    capacities = db.get_theater_capacities()
+    missing = [t for t in theater_ids if t not in capacities]
+    if missing or not theater_ids:
+        raise ValueError(f"Theater not found: {', '.join(map(str, missing))}" if missing else 'Choose at least one theater')
+    selected = {t: capacities[t] or 100 for t in theater_ids}
+
+    slots = parse_time_slots(time_slots)
+    rows = expand_schedule(movie_id, selected, start_date, end_date, slots, price_template, weekdays)
+
+    if preview:
+        taken = db.get_show_slots(list(selected), _as_date(start_date).isoformat(), _as_date(end_date).isoformat())
+        new_rows = [row for row in rows if (row[1], row[2], row[3]) not in taken]
+    else:
+        # Checked again inside the insert transaction, so racing schedules cannot double-book a slot
+        new_rows = db.add_shows_in_free_slots(rows)
+
+    return {
+        'preview': preview,
+        'created': 0 if preview else len(new_rows),
+        'planned': len(new_rows),
+        'skipped': len(rows) - len(new_rows),
+        'shows': new_rows,
+    }
@@ -1,212 +1,627 @@
 import sqlite3
 import os
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from config import Config
+from seat_map import SeatMap, SeatConflictError
+import migrations
+from catalog_cache import catalog
+from booking_locks import show_locks, BookingBusyError
+from booking_writer import GroupCommitWriter, WriteTimeoutError
+import metrics
 
 # Use a simple file-based SQLite database in current directory
-DB_PATH = 'movienight.db'
+DB_PATH = Config.SQLITE_PATH
 
+logger = logging.getLogger(__name__)
+
+# Per-thread (i.e. per-request) query count and time spent in SQLite
+_query_stats = threading.local()
+
+def reset_query_stats():
+    _query_stats.count = 0
+    _query_stats.seconds = 0.0
+
+def get_query_stats():
+    return getattr(_query_stats, 'count', 0), getattr(_query_stats, 'seconds', 0.0)
+
+def _record_query(sql, params, elapsed, counted=True):
+    if counted:
+        _query_stats.count = getattr(_query_stats, 'count', 0) + 1
+    _query_stats.seconds = getattr(_query_stats, 'seconds', 0.0) + elapsed
+    if counted:
+        metrics.observe_query(sql, elapsed)
+    if sql is not None and logger.isEnabledFor(logging.DEBUG):
+        logger.debug('SQL %.2fms: %s params=%r', elapsed * 1000, ' '.join(sql.split()), params)
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            _record_query(sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            _record_query(sql, '<many>', time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _record_query(None, None, time.perf_counter() - start, counted=False)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _record_query(None, None, time.perf_counter() - start, counted=False)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements feed the per-request query stats."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+class PoolTimeoutError(Exception):
+    pass
+
+class ConnectionPool:
+    """Bounded pool of pre-tuned SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out LIFO so the
+    most recently used (warmest) connection is reused first. A thread that
+    already holds a connection gets the same one back on nested acquires.
+    """
+
+    def __init__(self, db_path, size=None, timeout=None):
+        self.db_path = db_path
+        self.size = size or Config.SQLITE_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.SQLITE_POOL_TIMEOUT
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._local = threading.local()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path,
+                               timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+                               check_same_thread=False,
+                               factory=TimedConnection,
+                               cached_statements=Config.SQLITE_STATEMENT_CACHE)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size={-int(Config.SQLITE_CACHE_SIZE_KB)}')
+        conn.execute(f'PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def acquire(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    try:
+                        conn = self._open()
+                    except Exception:
+                        self._opened -= 1
+                        raise
+            if conn is None:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeoutError(
+                        f'No SQLite connection available after {self.timeout}s')
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+    def stats(self):
+        return {'size': self.size, 'opened': self._opened, 'idle': self._idle.qsize()}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+@contextmanager
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+# Group-commit writer for booking and food-order inserts
+writer = GroupCommitWriter(get_connection)
 
 def init_database():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    print("Creating database tables with SQL...")
-    
-    # Create movies table
-    movies_sql = '''CREATE TABLE IF NOT EXISTS movies (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        duration INTEGER,
-        genre TEXT,
-        language TEXT,
-        release_date TEXT,
-        image_url TEXT
-    )'''
-    cursor.execute(movies_sql)
-    print("Movies table created")
-    
-    # Create theaters table
-    theaters_sql = '''CREATE TABLE IF NOT EXISTS theaters (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        location TEXT,
-        total_seats INTEGER DEFAULT 100
-    )'''
-    cursor.execute(theaters_sql)
-    print("Theaters table created")
-    
-    # Create shows table
-    shows_sql = '''CREATE TABLE IF NOT EXISTS shows (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        movie_id INTEGER,
-        theater_id INTEGER,
-        show_date TEXT,
-        show_time TEXT,
-        price REAL,
-        available_seats INTEGER
-    )'''
-    cursor.execute(shows_sql)
-    print("Shows table created")
-    
-    # Add sample data if tables are empty
-    cursor.execute('SELECT COUNT(*) FROM movies')
-    if cursor.fetchone()[0] == 0:
-        print("Adding sample movies...")
-        sample_movies = [
-            ('Avengers: Endgame', 'Epic superhero finale', 181, 'Action', 'English', '2024-01-15', 'https://upload.wikimedia.org/wikipedia/en/0/0d/Avengers_Endgame_poster.jpg'),
-            ('Spider-Man', 'Friendly neighborhood hero', 148, 'Action', 'English', '2024-02-01', 'https://upload.wikimedia.org/wikipedia/en/2/21/Web_of_Spider-Man_Vol_1_129-1.png'),
-            ('The Dark Knight', 'Batman vs Joker', 152, 'Action', 'English', '2024-01-20', 'https://upload.wikimedia.org/wikipedia/en/1/1c/The_Dark_Knight_%282008_film%29.jpg')
-        ]
-        
-        for movie in sample_movies:
-            cursor.execute('INSERT INTO movies (title, description, duration, genre, language, release_date, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)', movie)
-        print(f"Added {len(sample_movies)} sample movies")
-    else:
-        # Update existing movies with proper images
-        update_all_movie_images()
-    
-    # Add sample theaters
-    cursor.execute('SELECT COUNT(*) FROM theaters')
-    if cursor.fetchone()[0] == 0:
-        print("Adding sample theaters...")
-        sample_theaters = [
-            ('PVR Cinemas', 'Mall Road', 96),
-            ('INOX Theater', 'City Center', 120),
-            ('Cineplex', 'Downtown', 80)
-        ]
-        
-        for theater in sample_theaters:
-            cursor.execute('INSERT INTO theaters (name, location, total_seats) VALUES (?, ?, ?)', theater)
-        print(f"Added {len(sample_theaters)} sample theaters")
-    
-    # Add sample shows
-    cursor.execute('SELECT COUNT(*) FROM shows')
-    if cursor.fetchone()[0] == 0:
-        print("Adding sample shows...")
-        sample_shows = [
-            (1, 1, '2024-12-25', '18:00', 250.0, 96),
-            (1, 2, '2024-12-25', '21:00', 300.0, 120),
-            (2, 1, '2024-12-26', '15:00', 200.0, 96),
-            (2, 3, '2024-12-26', '19:30', 220.0, 80),
-            (3, 2, '2024-12-27', '16:00', 280.0, 120),
-            (3, 3, '2024-12-27', '20:00', 260.0, 80)
-        ]
-        
-        for show in sample_shows:
-            cursor.execute('INSERT INTO shows (movie_id, theater_id, show_date, show_time, price, available_seats) VALUES (?, ?, ?, ?, ?, ?)', show)
-        print(f"Added {len(sample_shows)} sample shows")
-    
-    # Initialize food tables
-    init_food_table()
-    
-    conn.commit()
-    conn.close()
-    print("Database initialization complete!\n")
+    with get_connection() as conn:
+        version = migrations.migrate(conn)
+    logger.info('Database ready (schema version %s)', version)
+    return version
 
 def add_movie(title, description, duration, genre, language, release_date, image_url):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # SQL INSERT operation
-    sql_query = '''INSERT INTO movies (title, description, duration, genre, language, release_date, image_url)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)'''
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    print(f"\n💾 SQL Query: {sql_query}")
-    print(f"📊 Data: {(title, description, duration, genre, language, release_date, image_url)}")
+        # SQL INSERT operation
+        sql_query = '''INSERT INTO movies (title, description, duration, genre, language, release_date, image_url)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)'''
     
-    cursor.execute(sql_query, (title, description, duration, genre, language, release_date, image_url))
-    movie_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute(sql_query, (title, description, duration, genre, language, release_date, image_url))
+        movie_id = cursor.lastrowid
+        conn.commit()
     
-    print(f"✅ Movie added successfully with ID: {movie_id}\n")
+    catalog.invalidate(('movies',), ('movie', movie_id), ('movie_choices',), ('facets',))
+    logger.info('Movie added with id %s', movie_id)
     return movie_id
 
-def get_all_movies():
-    conn = get_connection()
-    cursor = conn.cursor()
+def _insert_many(sql_query, rows):
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(sql_query, rows)
+        conn.commit()
+    return len(rows)
+
+def add_movies_bulk(rows):
+    # rows: (title, description, duration, genre, language, release_date, image_url)
+    count = _insert_many('''INSERT INTO movies (title, description, duration, genre, language, release_date, image_url)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+    catalog.invalidate(('movies',), ('movie',), ('movie_choices',), ('facets',))
+    return count
+
+def add_theaters_bulk(rows):
+    # rows: (name, location, total_seats)
+    count = _insert_many('INSERT INTO theaters (name, location, total_seats) VALUES (?, ?, ?)', rows)
+    catalog.invalidate(('theaters',), ('theater',), ('facets',))
+    return count
+
+def _init_occupancy(conn, after_id):
+    """Start empty occupancy counters for shows with ``id > after_id``."""
+    capacities = {theater_id: SeatMap(total_seats).capacity
+                  for theater_id, total_seats in conn.execute('SELECT id, total_seats FROM theaters')}
+    rows = [(show_id, theater_id, show_date, capacities.get(theater_id, SeatMap().capacity))
+            for show_id, theater_id, show_date in conn.execute(
+                'SELECT id, theater_id, show_date FROM shows WHERE id > ?', (after_id,))]
+    conn.executemany('INSERT OR IGNORE INTO show_occupancy (show_id, theater_id, show_date, capacity) VALUES (?, ?, ?, ?)',
+                     rows)
+    # Seats left always follow the theater, whatever the caller passed
+    conn.executemany('UPDATE shows SET available_seats = ? WHERE id = ?', [(row[3], row[0]) for row in rows])
+
+def _insert_shows(conn, rows):
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM shows').fetchone()[0]
+    conn.executemany('''INSERT INTO shows (movie_id, theater_id, show_date, show_time, price, available_seats)
+                        VALUES (?, ?, ?, ?, ?, ?)''', rows)
+    _init_occupancy(conn, last_id)
+
+def _invalidate_shows(rows):
+    movie_ids = {row[0] for row in rows}
+    if len(movie_ids) > 32:
+        catalog.invalidate(('shows',), ('shows_by_movie',), ('facets',))
+    else:
+        catalog.invalidate(('shows',), ('facets',), *[('shows_by_movie', movie_id) for movie_id in movie_ids])
+
+def add_shows_bulk(rows):
+    # rows: (movie_id, theater_id, show_date, show_time, price, available_seats)
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        _insert_shows(conn, rows)
+        conn.commit()
+    _invalidate_shows(rows)
+    return len(rows)
+
+def add_shows_in_free_slots(rows):
+    """Insert the show ``rows`` whose (theater, date, HH:MM) slot is still free; returns those rows.
     
-    # SQL SELECT operation
-    sql_query = 'SELECT * FROM movies ORDER BY id DESC'
-    print(f"💾 SQL Query: {sql_query}")
+    The slot check and the insert share one write transaction, so concurrent
+    schedules or imports cannot both claim a slot.
+    """
+    if not rows:
+        return []
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        taken = _show_slots(conn, {row[1] for row in rows}, min(row[2] for row in rows), max(row[2] for row in rows))
+        new_rows = [row for row in rows if (row[1], row[2], row[3][:5]) not in taken]
+        if new_rows:
+            _insert_shows(conn, new_rows)
+        conn.commit()
+    if new_rows:
+        _invalidate_shows(new_rows)
+    return new_rows
+
+def _show_slots(conn, theater_ids, start_date, end_date):
+    # Occupied (theater_id, show_date, HH:MM) slots, answered from idx_shows_theater
+    theater_ids = list(theater_ids)
+    placeholders = ', '.join('?' * len(theater_ids))
+    sql_query = f'''SELECT theater_id, show_date, substr(show_time, 1, 5) FROM shows
+                    WHERE theater_id IN ({placeholders}) AND show_date BETWEEN ? AND ?'''
+    return set(conn.execute(sql_query, theater_ids + [start_date, end_date]).fetchall())
+
+def get_show_slots(theater_ids, start_date, end_date):
+    if not theater_ids:
+        return set()
+    with get_connection() as conn:
+        return _show_slots(conn, theater_ids, start_date, end_date)
+
+def get_theater_capacities():
+    with get_connection() as conn:
+        rows = conn.execute('SELECT id, total_seats FROM theaters').fetchall()
+    return dict(rows)
+
+def get_movie_ids():
+    with get_connection() as conn:
+        rows = conn.execute('SELECT id FROM movies').fetchall()
+    return {row[0] for row in rows}
+
+@catalog.cached(lambda: ('movies',))
+def get_all_movies():
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute(sql_query)
-    movies = cursor.fetchall()
-    conn.close()
+        # SQL SELECT operation
+        sql_query = 'SELECT * FROM movies ORDER BY id DESC'
+        cursor.execute(sql_query)
+        movies = cursor.fetchall()
     
-    print(f"📈 Retrieved {len(movies)} movies from database")
+    logger.debug('Retrieved %d movies', len(movies))
     return movies
 
+MOVIE_FILTERS = ('genre', 'language', 'released_from', 'released_to', 'city', 'theater_id')
+
+def _movie_conditions(filters, today, skip=()):
+    """WHERE terms over ``movies m`` for every filter not named in ``skip``.
+
+    City and theater mean "has a show on or after ``today`` there".
+    """
+    conditions, params = [], []
+    for name, term in (('genre', 'm.genre = ?'), ('language', 'm.language = ?'),
+                       ('released_from', 'm.release_date >= ?'), ('released_to', 'm.release_date <= ?')):
+        if filters.get(name) and name not in skip:
+            conditions.append(term)
+            params.append(filters[name])
+
+    city = filters.get('city') if 'city' not in skip else None
+    theater_id = filters.get('theater_id') if 'theater_id' not in skip else None
+    if city or theater_id:
+        # A primary-key probe of movie_venues per candidate movie
+        venue = ('EXISTS (SELECT 1 FROM movie_venues v JOIN theaters t ON t.id = v.theater_id '
+                 'WHERE v.movie_id = m.id AND v.last_show_date >= ?')
+        params.append(today)
+        if city:
+            venue += ' AND t.location = ?'
+            params.append(city)
+        if theater_id:
+            venue += ' AND v.theater_id = ?'
+            params.append(theater_id)
+        conditions.append(venue + ')')
+    return conditions, params
+
+def _and(conditions):
+    return ''.join(' AND ' + condition for condition in conditions)
+
+def _filter_key(filters):
+    return tuple((name, filters[name]) for name in MOVIE_FILTERS if filters.get(name))
+
+def get_movies_page(filters=None, after=None, limit=24):
+    """One page of movies matching ``filters`` (see MOVIE_FILTERS), newest first.
+    
+    Keyset pagination on the primary key: ``after`` is the id of the last
+    movie on the previous page. Returns ``(rows, next_after)`` with the same
+    rows as get_all_movies; ``next_after`` is None on the last page.
+    """
+    from datetime import date
+    
+    return _get_movies_page(_filter_key(filters or {}), date.today().isoformat(), after, limit)
+
+# Unfiltered pages only change with the movies; filtered ones also follow shows and theaters
+@catalog.cached(lambda key, today, after, limit:
+                (('facets', 'movies', key, today) if key else ('movies', 'page')) + (after, limit))
+def _get_movies_page(key, today, after, limit):
+    conditions, params = _movie_conditions(dict(key), today)
+    if after is not None:
+        conditions.append('m.id < ?')
+        params.append(after)
+    params.append(limit + 1)
+    with get_connection() as conn:
+        rows = conn.execute(f'SELECT * FROM movies m WHERE 1{_and(conditions)} ORDER BY m.id DESC LIMIT ?',
+                            params).fetchall()
+    
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1][0]
+    return rows, next_after
+
+def get_movie_facets(filters=None):
+    """Per-value movie counts for each filter, all grouped in SQL.
+
+    Each facet applies every other active filter but not its own, so the
+    counts show what picking a different value would return. Returns a dict
+    of ``genre``, ``language``, ``year`` and ``city`` lists of
+    ``(value, count)``, and ``theater`` as ``(id, name, count)``.
+    """
+    from datetime import date
+
+    return _get_movie_facets(_filter_key(filters or {}), date.today().isoformat())
+
+@catalog.cached(lambda key, today: ('facets', 'counts', key, today))
+def _get_movie_facets(key, today):
+    filters = dict(key)
+    facets = {}
+    with get_connection() as conn:
+        for name, column, skip, order in (
+                ('genre', 'm.genre', ('genre',), 'value'),
+                ('language', 'm.language', ('language',), 'value'),
+                ('year', 'substr(m.release_date, 1, 4)', ('released_from', 'released_to'), 'value DESC')):
+            conditions, params = _movie_conditions(filters, today, skip)
+            facets[name] = conn.execute(f'''SELECT {column} AS value, COUNT(*) FROM movies m
+                                            WHERE {column} != ''{_and(conditions)}
+                                            GROUP BY value ORDER BY {order}''', params).fetchall()
+
+        # Venue facets read movie_venues (one row per movie and theater), not shows
+        conditions, params = _movie_conditions(filters, today, ('city', 'theater_id'))
+        venue_sql = f'''FROM movie_venues v JOIN theaters t ON t.id = v.theater_id JOIN movies m ON m.id = v.movie_id
+                        WHERE v.last_show_date >= ?{_and(conditions)}'''
+        params = [today] + params
+        facets['city'] = conn.execute(f'''SELECT t.location, COUNT(DISTINCT v.movie_id) {venue_sql}
+                                          GROUP BY t.location ORDER BY t.location''', params).fetchall()
+
+        if filters.get('city'):
+            venue_sql += ' AND t.location = ?'
+            params.append(filters['city'])
+        facets['theater'] = conn.execute(f'''SELECT t.id, t.name, COUNT(*) {venue_sql}
+                                             GROUP BY t.id ORDER BY t.name''', params).fetchall()
+    return facets
+
 def add_theater(name, location, total_seats):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''INSERT INTO theaters (name, location, total_seats)
-                     VALUES (?, ?, ?)''', (name, location, total_seats))
-    theater_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''INSERT INTO theaters (name, location, total_seats)
+                         VALUES (?, ?, ?)''', (name, location, total_seats))
+        theater_id = cursor.lastrowid
+        conn.commit()
+    catalog.invalidate(('theaters',), ('facets',))
     return theater_id
 
+@catalog.cached(lambda: ('theaters',))
 def get_all_theaters():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM theaters')
-    theaters = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM theaters')
+        theaters = cursor.fetchall()
     return theaters
 
 def add_show(movie_id, theater_id, show_date, show_time, price, available_seats):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    sql_query = '''INSERT INTO shows (movie_id, theater_id, show_date, show_time, price, available_seats)
-                   VALUES (?, ?, ?, ?, ?, ?)'''
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    print(f"\n💾 SQL Query: {sql_query}")
-    print(f"📊 Data: {(movie_id, theater_id, show_date, show_time, price, available_seats)}")
+        sql_query = '''INSERT INTO shows (movie_id, theater_id, show_date, show_time, price, available_seats)
+                       VALUES (?, ?, ?, ?, ?, ?)'''
     
-    cursor.execute(sql_query, (movie_id, theater_id, show_date, show_time, price, available_seats))
-    show_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute(sql_query, (movie_id, theater_id, show_date, show_time, price, available_seats))
+        show_id = cursor.lastrowid
+        _init_occupancy(conn, show_id - 1)
+        conn.commit()
     
-    print(f"✅ Show added successfully with ID: {show_id}\n")
+    catalog.invalidate(('shows',), ('shows_by_movie', movie_id), ('facets',))
+    logger.info('Show added with id %s', show_id)
     return show_id
 
+@catalog.cached(lambda: ('shows',))
 def get_all_shows():
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    sql_query = '''SELECT s.*, m.title, t.name as theater_name 
+        sql_query = '''SELECT s.*, m.title, t.name as theater_name 
+                       FROM shows s 
+                       LEFT JOIN movies m ON s.movie_id = m.id 
+                       LEFT JOIN theaters t ON s.theater_id = t.id
+                       ORDER BY s.id DESC'''
+    
+        cursor.execute(sql_query)
+        shows = cursor.fetchall()
+    
+    logger.debug('Retrieved %d shows', len(shows))
+    return shows
+
+@catalog.cached(lambda movie_id: ('movie', movie_id))
+def get_movie_by_id(movie_id):
+    with get_connection() as conn:
+        movie = conn.execute('SELECT * FROM movies WHERE id = ?', (movie_id,)).fetchone()
+    return movie
+
+@catalog.cached(lambda: ('movie_choices',))
+def get_movie_choices():
+    with get_connection() as conn:
+        movies = conn.execute('SELECT id, title FROM movies ORDER BY title').fetchall()
+    return movies
+
+def search_movies(query, limit=20):
+    """Movies matching ``query``, best first (bm25, title weighted highest).
+    
+    Every word must match; the last one also matches as a prefix so results
+    follow the user's typing. Returns movie rows.
+    """
+    import re
+    
+    words = re.findall(r'\w+', query.lower())[:8]
+    if not words:
+        return []
+    # Quoting each word keeps FTS5 syntax (AND, NEAR, column:, ...) out of user input
+    match = ' '.join(f'"{word}"' for word in words) + '*'
+    
+    with get_connection() as conn:
+        rows = conn.execute('''SELECT m.* FROM movies_fts f JOIN movies m ON m.id = f.rowid
+                               WHERE movies_fts MATCH ?
+                               ORDER BY bm25(movies_fts, 10.0, 1.0, 4.0, 2.0) LIMIT ?''',
+                            (match, limit)).fetchall()
+    return rows
+
+def get_movie_titles():
+    with get_connection() as conn:
+        rows = conn.execute('SELECT id, title FROM movies').fetchall()
+    return rows
+
+@catalog.cached(lambda theater_id: ('theater', theater_id))
+def get_theater_by_id(theater_id):
+    with get_connection() as conn:
+        theater = conn.execute('SELECT * FROM theaters WHERE id = ?', (theater_id,)).fetchone()
+    return theater
+
+def get_shows(movie_id=None, theater_id=None, upcoming_only=False, limit=None):
+    # Same row shape as get_all_shows, with every filter applied in SQL
+    conditions, params = [], []
+    if movie_id is not None:
+        conditions.append('s.movie_id = ?')
+        params.append(movie_id)
+    if theater_id is not None:
+        conditions.append('s.theater_id = ?')
+        params.append(theater_id)
+    if upcoming_only:
+        conditions.append("s.show_date >= date('now', 'localtime')")
+    
+    sql_query = '''SELECT s.id, s.movie_id, s.theater_id, s.show_date, s.show_time, s.price, s.available_seats,
+                          m.title, t.name as theater_name
                    FROM shows s 
                    LEFT JOIN movies m ON s.movie_id = m.id 
-                   LEFT JOIN theaters t ON s.theater_id = t.id
-                   ORDER BY s.id DESC'''
+                   LEFT JOIN theaters t ON s.theater_id = t.id'''
+    if conditions:
+        sql_query += ' WHERE ' + ' AND '.join(conditions)
+    if movie_id is not None:
+        sql_query += ' ORDER BY s.show_date, s.show_time'
+    else:
+        sql_query += ' ORDER BY s.id DESC'
+    if limit is not None:
+        sql_query += ' LIMIT ?'
+        params.append(limit)
     
-    print(f"💾 SQL Query: {sql_query}")
+    with get_connection() as conn:
+        shows = conn.execute(sql_query, params).fetchall()
+    return shows
+
+def get_shows_page(movie_id=None, theater_id=None, date_from=None, date_to=None, after=None, limit=50):
+    """One page of shows in date and time order, using keyset pagination.
     
-    cursor.execute(sql_query)
-    shows = cursor.fetchall()
-    conn.close()
+    ``after`` is the ``(show_date, show_time, id)`` of the last row of the
+    previous page. Returns ``(rows, next_after)`` with get_shows rows;
+    ``next_after`` is None on the last page.
+    """
+    conditions, params = [], []
+    if movie_id is not None:
+        conditions.append('s.movie_id = ?')
+        params.append(movie_id)
+    if theater_id is not None:
+        conditions.append('s.theater_id = ?')
+        params.append(theater_id)
+    if date_from:
+        conditions.append('s.show_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('s.show_date <= ?')
+        params.append(date_to)
+    if after is not None:
+        conditions.append('(s.show_date, s.show_time, s.id) > (?, ?, ?)')
+        params.extend(after)
     
-    print(f"📈 Retrieved {len(shows)} shows from database")
-    return shows
+    sql_query = '''SELECT s.id, s.movie_id, s.theater_id, s.show_date, s.show_time, s.price, s.available_seats,
+                          m.title, t.name as theater_name
+                   FROM shows s 
+                   LEFT JOIN movies m ON s.movie_id = m.id 
+                   LEFT JOIN theaters t ON s.theater_id = t.id'''
+    if conditions:
+        sql_query += ' WHERE ' + ' AND '.join(conditions)
+    sql_query += ' ORDER BY s.show_date, s.show_time, s.id LIMIT ?'
+    params.append(limit + 1)
+    
+    with get_connection() as conn:
+        rows = conn.execute(sql_query, params).fetchall()
+    
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1][3], rows[-1][4], rows[-1][0])
+    return rows, next_after
 
-def update_movie_image(movie_id, image_url):
-    conn = get_connection()
-    cursor = conn.cursor()
+@catalog.cached(lambda movie_id, upcoming_only=False: ('shows_by_movie', movie_id, upcoming_only))
+def get_shows_by_movie(movie_id, upcoming_only=False):
+    return get_shows(movie_id=movie_id, upcoming_only=upcoming_only)
+
+def get_movie_shows_page(movie_id, upcoming_only=True, after=None, limit=50):
+    """get_shows_page for one movie, from today onwards unless ``upcoming_only`` is False."""
+    from datetime import date
     
-    sql_query = 'UPDATE movies SET image_url = ? WHERE id = ?'
-    print(f"💾 SQL Query: {sql_query}")
-    print(f"📊 Data: {(image_url, movie_id)}")
+    date_from = date.today().isoformat() if upcoming_only else None
+    return _get_movie_shows_page(movie_id, date_from, after, limit)
+
+@catalog.cached(lambda movie_id, date_from, after, limit: ('shows_by_movie', movie_id, 'page', date_from, after, limit))
+def _get_movie_shows_page(movie_id, date_from, after, limit):
+    return get_shows_page(movie_id=movie_id, date_from=date_from, after=after, limit=limit)
+
+def update_movie_image(movie_id, image_url):
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute(sql_query, (image_url, movie_id))
-    conn.commit()
-    conn.close()
+        sql_query = 'UPDATE movies SET image_url = ? WHERE id = ?'
+        cursor.execute(sql_query, (image_url, movie_id))
+        conn.commit()
     
-    print(f"✅ Movie {movie_id} image updated successfully\n")
+    catalog.invalidate(('movies',), ('movie', movie_id), ('facets',))
+    logger.info('Movie %s image updated', movie_id)
 
 def update_all_movie_images():
     # High-quality movie poster URLs
@@ -216,160 +631,669 @@ def update_all_movie_images():
         'The Dark Knight': 'https://upload.wikimedia.org/wikipedia/en/1/1c/The_Dark_Knight_%282008_film%29.jpg'
     }
     
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    print("Updating movie poster images...")
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    for title, image_url in movie_images.items():
-        cursor.execute('SELECT id FROM movies WHERE title = ?', (title,))
-        result = cursor.fetchone()
-        if result:
-            movie_id = result[0]
-            cursor.execute('UPDATE movies SET image_url = ? WHERE id = ?', (image_url, movie_id))
-            print(f"Updated {title} poster")
+        for title, image_url in movie_images.items():
+            cursor.execute('SELECT id FROM movies WHERE title = ?', (title,))
+            result = cursor.fetchone()
+            if result:
+                movie_id = result[0]
+                cursor.execute('UPDATE movies SET image_url = ? WHERE id = ?', (image_url, movie_id))
+                logger.info('Updated %s poster', title)
     
-    conn.commit()
-    conn.close()
-    print("All movie posters updated!\n")
+        conn.commit()
+    catalog.invalidate(('movies',), ('movie',), ('facets',))
+
 def get_show_by_id(show_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    sql_query = '''SELECT s.id, s.movie_id, s.theater_id, s.show_date, s.show_time, s.price, s.available_seats, m.title, t.name as theater_name
-                   FROM shows s 
-                   LEFT JOIN movies m ON s.movie_id = m.id 
-                   LEFT JOIN theaters t ON s.theater_id = t.id
-                   WHERE s.id = ?'''
+        sql_query = '''SELECT s.id, s.movie_id, s.theater_id, s.show_date, s.show_time, s.price, s.available_seats, m.title, t.name as theater_name
+                       FROM shows s 
+                       LEFT JOIN movies m ON s.movie_id = m.id 
+                       LEFT JOIN theaters t ON s.theater_id = t.id
+                       WHERE s.id = ?'''
     
-    cursor.execute(sql_query, (show_id,))
-    show = cursor.fetchone()
-    conn.close()
+        cursor.execute(sql_query, (show_id,))
+        show = cursor.fetchone()
     
     return show
 
-def add_booking(show_id, customer_name, customer_email, customer_phone, selected_seats, total_amount):
-    conn = get_connection()
-    cursor = conn.cursor()
+def _load_seat_map(conn, show_id):
+    row = conn.execute('SELECT capacity, booked FROM seat_maps WHERE show_id = ?', (show_id,)).fetchone()
+    if row:
+        return SeatMap.from_blob(row[0], row[1]), True
+    
+    # First touch of this show: size the bitmap from the theater and fold in
+    # any bookings made before seat maps existed.
+    cap_row = conn.execute('''SELECT t.total_seats FROM shows s
+                              LEFT JOIN theaters t ON s.theater_id = t.id
+                              WHERE s.id = ?''', (show_id,)).fetchone()
+    if cap_row is None:
+        raise ValueError(f'Show {show_id} not found')
     
     import json
+    seat_map = SeatMap(cap_row[0])
+    for (seat_numbers,) in conn.execute('SELECT seat_numbers FROM bookings WHERE show_id = ?', (show_id,)):
+        for seat_id in json.loads(seat_numbers) if seat_numbers else []:
+            try:
+                seat_map.bits |= 1 << seat_map.index(seat_id)
+            except ValueError:
+                pass
+    return seat_map, False
+
+def _save_seat_map(conn, show_id, seat_map, exists):
+    """Write the bitmap and return the show's new seat version."""
+    if exists:
+        return conn.execute('UPDATE seat_maps SET booked = ?, version = version + 1 WHERE show_id = ? RETURNING version',
+                            (seat_map.to_blob(), show_id)).fetchone()[0]
+    conn.execute('INSERT INTO seat_maps (show_id, capacity, booked, version) VALUES (?, ?, ?, 1)',
+                 (show_id, seat_map.capacity, seat_map.to_blob()))
+    return 1
+
+def _log_seat_event(conn, show_id, version, kind, mask):
+    """Record a seat change ('booked', 'held' or 'released') in the caller's transaction.
     
-    sql_query = '''INSERT INTO bookings (show_id, customer_name, customer_email, customer_phone, seat_numbers, total_amount)
-                   VALUES (?, ?, ?, ?, ?, ?)'''
+    Every seat version bump gets an event, so versions without gaps mean the
+    log can answer "what changed since version N".
+    """
+    import time
+    
+    now = time.time()
+    cursor = conn.execute('INSERT INTO seat_events (show_id, version, kind, seats, created_at) VALUES (?, ?, ?, ?, ?)',
+                          (show_id, version, kind, mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), now))
+    if cursor.lastrowid % 1000 == 0:
+        conn.execute('DELETE FROM seat_events WHERE created_at < ?', (now - Config.SEAT_EVENT_RETENTION_SECONDS,))
+
+def _bump_occupancy(conn, show_id, sold=0, held=0):
+    """Apply seat count changes for a show in the caller's transaction."""
+    row = conn.execute('''UPDATE show_occupancy SET sold = sold + ?, held = held + ? WHERE show_id = ?
+                          RETURNING theater_id, show_date, MAX(capacity - sold, 0)''',
+                       (sold, held, show_id)).fetchone()
+    if row is None:
+        # No counters yet: count this show from its (already updated) seat data
+        _recount_occupancy(conn, [show_id])
+        return
+    if sold:
+        conn.execute('''INSERT INTO theater_daily_sales (theater_id, show_date, seats_sold) VALUES (?, ?, ?)
+                        ON CONFLICT (theater_id, show_date) DO UPDATE SET seats_sold = seats_sold + excluded.seats_sold''',
+                     (row[0], row[1], sold))
+        conn.execute('UPDATE shows SET available_seats = ? WHERE id = ?', (row[2], show_id))
+
+def _recount_occupancy(conn, show_ids):
+    """Recount sold and held seats for ``show_ids`` from seat maps and holds.
+    
+    Fixes any counter that disagrees (and the matching daily sales) and
+    returns how many shows needed fixing. Run inside a write transaction.
+    """
+    placeholders = ', '.join('?' * len(show_ids))
+    shows = conn.execute(f'''SELECT s.id, s.theater_id, s.show_date, m.capacity, m.booked FROM shows s
+                             LEFT JOIN seat_maps m ON m.show_id = s.id
+                             WHERE s.id IN ({placeholders})''', show_ids).fetchall()
+    held = {}
+    for show_id, seats in conn.execute(f'SELECT show_id, seats FROM seat_holds WHERE show_id IN ({placeholders})',
+                                       show_ids):
+        held[show_id] = held.get(show_id, 0) + int.from_bytes(seats, 'little').bit_count()
+    current = {row[0]: row[1:] for row in conn.execute(
+        f'''SELECT show_id, theater_id, show_date, capacity, sold, held FROM show_occupancy
+            WHERE show_id IN ({placeholders})''', show_ids)}
     
-    cursor.execute(sql_query, (show_id, customer_name, customer_email, customer_phone, 
-                              json.dumps(selected_seats), total_amount))
+    repaired = 0
+    for show_id, theater_id, show_date, capacity, booked in shows:
+        if capacity is None:
+            seat_map, _ = _load_seat_map(conn, show_id)
+        else:
+            seat_map = SeatMap.from_blob(capacity, booked)
+        expected = (theater_id, show_date, seat_map.capacity, seat_map.count(), held.get(show_id, 0))
+        old = current.get(show_id)
+        if old == expected:
+            continue
+        
+        repaired += 1
+        conn.execute('''INSERT OR REPLACE INTO show_occupancy (show_id, theater_id, show_date, capacity, sold, held)
+                        VALUES (?, ?, ?, ?, ?, ?)''', (show_id, *expected))
+        conn.execute('UPDATE shows SET available_seats = ? WHERE id = ?',
+                     (max(seat_map.capacity - seat_map.count(), 0), show_id))
+        if old is not None and old[3]:
+            conn.execute('UPDATE theater_daily_sales SET seats_sold = seats_sold - ? WHERE theater_id = ? AND show_date = ?',
+                         (old[3], old[0], old[1]))
+        if expected[3]:
+            conn.execute('''INSERT INTO theater_daily_sales (theater_id, show_date, seats_sold) VALUES (?, ?, ?)
+                            ON CONFLICT (theater_id, show_date) DO UPDATE SET seats_sold = seats_sold + excluded.seats_sold''',
+                         (theater_id, show_date, expected[3]))
+    return repaired
+
+def _recount_daily_sales(conn):
+    """Rebuild drifted theater_daily_sales rows from show_occupancy; returns rows fixed."""
+    expected = {(row[0], row[1]): row[2] for row in conn.execute(
+        '''SELECT theater_id, show_date, SUM(sold) FROM show_occupancy
+           WHERE theater_id IS NOT NULL AND show_date IS NOT NULL
+           GROUP BY theater_id, show_date HAVING SUM(sold) > 0''')}
+    current = {(row[0], row[1]): row[2] for row in conn.execute(
+        'SELECT theater_id, show_date, seats_sold FROM theater_daily_sales')}
     
-    booking_id = cursor.lastrowid
+    # A missing row and a zero row both mean nothing sold
+    fixed = [(key, total) for key, total in expected.items() if current.get(key, 0) != total]
+    stale = [key for key, total in current.items() if key not in expected and total]
+    conn.executemany('INSERT OR REPLACE INTO theater_daily_sales (theater_id, show_date, seats_sold) VALUES (?, ?, ?)',
+                     [(theater_id, show_date, total) for (theater_id, show_date), total in fixed])
+    conn.executemany('DELETE FROM theater_daily_sales WHERE theater_id = ? AND show_date = ?', stale)
+    return len(fixed) + len(stale)
+
+def reconcile_occupancy(chunk_size=500):
+    """Recount every show's occupancy counters from seat data and repair drift.
     
-    # Update available seats
-    cursor.execute('UPDATE shows SET available_seats = available_seats - ? WHERE id = ?', 
-                  (len(selected_seats), show_id))
+    Expired holds are released first, since they are otherwise only dropped
+    when their show is next touched. Shows are then checked ``chunk_size`` at
+    a time, each chunk in its own write transaction, so bookings keep
+    flowing between chunks. Returns ``{'shows': checked, 'repaired': shows
+    fixed, 'days_repaired': daily rows fixed, 'holds_released': expired holds}``.
+    """
+    holds_released = expire_seat_holds()
+    checked = repaired = 0
+    last_id = 0
+    while True:
+        with get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            show_ids = [row[0] for row in conn.execute('SELECT id FROM shows WHERE id > ? ORDER BY id LIMIT ?',
+                                                       (last_id, chunk_size))]
+            if not show_ids:
+                conn.rollback()
+                break
+            repaired += _recount_occupancy(conn, show_ids)
+            conn.commit()
+        checked += len(show_ids)
+        last_id = show_ids[-1]
     
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        orphans = conn.execute('DELETE FROM show_occupancy WHERE show_id NOT IN (SELECT id FROM shows)').rowcount
+        days_repaired = _recount_daily_sales(conn)
+        conn.commit()
     
-    return booking_id
+    if repaired or orphans:
+        # Show listings carry available_seats
+        catalog.invalidate(('shows',), ('shows_by_movie',))
+    return {'shows': checked, 'repaired': repaired + orphans, 'days_repaired': days_repaired,
+            'holds_released': holds_released}
 
-def get_booked_seats(show_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_shows_occupancy(show_ids):
+    """``{show_id: (capacity, sold, held, free)}`` for the shows that have counters."""
+    show_ids = list(show_ids)
+    if not show_ids:
+        return {}
+    placeholders = ', '.join('?' * len(show_ids))
+    with get_connection() as conn:
+        rows = conn.execute(f'SELECT show_id, capacity, sold, held FROM show_occupancy WHERE show_id IN ({placeholders})',
+                            show_ids).fetchall()
+    return {show_id: (capacity, sold, held, max(capacity - sold - held, 0))
+            for show_id, capacity, sold, held in rows}
+
+def get_theater_daily_sales(theater_id=None, date_from=None, date_to=None):
+    """``[(theater_id, show_date, seats_sold)]``, for one theater or all, oldest first."""
+    sql_query = 'SELECT theater_id, show_date, seats_sold FROM theater_daily_sales WHERE 1'
+    params = []
+    if theater_id is not None:
+        sql_query += ' AND theater_id = ?'
+        params.append(theater_id)
+    if date_from:
+        sql_query += ' AND show_date >= ?'
+        params.append(date_from)
+    if date_to:
+        sql_query += ' AND show_date <= ?'
+        params.append(date_to)
+    with get_connection() as conn:
+        rows = conn.execute(sql_query + ' ORDER BY theater_id, show_date', params).fetchall()
+    return rows
+
+def _held_mask(conn, show_id, now, exclude_token=None):
+    mask = 0
+    for token, seats in conn.execute('''SELECT token, seats FROM seat_holds
+                                        WHERE show_id = ? AND expires_at > ?''', (show_id, now)):
+        if token != exclude_token:
+            mask |= int.from_bytes(seats, 'little')
+    return mask
+
+def add_seat_hold(token, show_id, seats, expires_at):
+    import json
+    import time
     
-    cursor.execute('SELECT seat_numbers FROM bookings WHERE show_id = ?', (show_id,))
-    bookings = cursor.fetchall()
-    conn.close()
+    with show_locks.lock(show_id), get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        
+        seat_map, exists = _load_seat_map(conn, show_id)
+        mask = seat_map.mask(seats)
+        taken = (seat_map.bits | _held_mask(conn, show_id, time.time())) & mask
+        if taken:
+            raise SeatConflictError(seat_map.labels(taken))
+        
+        conn.execute('''INSERT INTO seat_holds (token, show_id, seats, seat_numbers, expires_at)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     (token, show_id, SeatMap(seat_map.capacity, mask).to_blob(), json.dumps(seats), expires_at))
+        _log_seat_event(conn, show_id, _save_seat_map(conn, show_id, seat_map, exists), 'held', mask)
+        _bump_occupancy(conn, show_id, held=mask.bit_count())
+        conn.commit()
+
+def delete_seat_holds(tokens, expired_before=None):
+    tokens = list(tokens)
+    if not tokens:
+        return 0
+    
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        placeholders = ', '.join('?' * len(tokens))
+        sql_query = f'DELETE FROM seat_holds WHERE token IN ({placeholders})'
+        params = tokens
+        if expired_before is not None:
+            # Only drop holds that are still expired (a hold may have been re-read since)
+            sql_query += ' AND expires_at <= ?'
+            params = tokens + [expired_before]
+        rows = conn.execute(sql_query + ' RETURNING show_id, seats', params).fetchall()
+        released = {}
+        for show_id, seats in rows:
+            released[show_id] = released.get(show_id, 0) | int.from_bytes(seats, 'little')
+        
+        # Tell availability pollers and streams that these seats are free again
+        for show_id, mask in released.items():
+            seat_map, exists = _load_seat_map(conn, show_id)
+            _log_seat_event(conn, show_id, _save_seat_map(conn, show_id, seat_map, exists), 'released', mask)
+            _bump_occupancy(conn, show_id, held=-mask.bit_count())
+        conn.commit()
+    return len(rows)
+
+def get_active_seat_holds():
+    with get_connection() as conn:
+        rows = conn.execute('SELECT token, expires_at FROM seat_holds').fetchall()
+    return rows
+
+def expire_seat_holds(now=None, chunk_size=500):
+    """Release every expired hold, for all shows, ``chunk_size`` at a time."""
+    import time
+    
+    now = now or time.time()
+    released = 0
+    while True:
+        with get_connection() as conn:
+            tokens = [row[0] for row in conn.execute('SELECT token FROM seat_holds WHERE expires_at <= ? LIMIT ?',
+                                                     (now, chunk_size))]
+        if not tokens:
+            return released
+        released += delete_seat_holds(tokens, expired_before=now)
+
+def expire_show_holds(show_id, now=None):
+    """Release this show's expired holds (any worker may have placed them)."""
+    import time
     
+    now = now or time.time()
+    with get_connection() as conn:
+        tokens = [row[0] for row in conn.execute('SELECT token FROM seat_holds WHERE show_id = ? AND expires_at <= ?',
+                                                 (show_id, now))]
+    return delete_seat_holds(tokens, expired_before=now) if tokens else 0
+
+def get_seat_availability(show_id, since=None):
+    """Booked and held seats for a show, with its seat version.
+    
+    Returns ``(booked, held, version, changed)``. With ``since``, ``changed``
+    is the mask of seats touched after that version, or None when the event
+    log no longer covers it and the caller needs the full maps.
+    """
+    import time
+    
+    with get_connection() as conn:
+        # One read transaction so the maps and version agree
+        conn.execute('BEGIN')
+        booked, _ = _load_seat_map(conn, show_id)
+        row = conn.execute('SELECT version FROM seat_maps WHERE show_id = ?', (show_id,)).fetchone()
+        version = row[0] if row else 0
+        held = SeatMap(booked.capacity, _held_mask(conn, show_id, time.time()) & ~booked.bits)
+        
+        changed = None
+        if since is not None and 0 <= since <= version:
+            events = conn.execute('SELECT version, seats FROM seat_events WHERE show_id = ? AND version > ? ORDER BY version',
+                                  (show_id, since)).fetchall()
+            # Only trust the log if it has every version after ``since``
+            if [v for v, _ in events] == list(range(since + 1, version + 1)):
+                changed = 0
+                for _, seats in events:
+                    changed |= int.from_bytes(seats, 'little')
+        conn.rollback()
+    return booked, held, version, changed
+
+def get_seat_events(after_id, show_id=None, limit=500):
+    """Seat events with ``id > after_id`` in commit order: (id, show_id, version, kind, seats mask)."""
+    with get_connection() as conn:
+        if show_id is None:
+            rows = conn.execute('SELECT id, show_id, version, kind, seats FROM seat_events WHERE id > ? ORDER BY id LIMIT ?',
+                                (after_id, limit)).fetchall()
+        else:
+            rows = conn.execute('''SELECT id, show_id, version, kind, seats FROM seat_events
+                                    WHERE show_id = ? AND id > ? ORDER BY id LIMIT ?''',
+                                (show_id, after_id, limit)).fetchall()
+    return [(r[0], r[1], r[2], r[3], int.from_bytes(r[4], 'little')) for r in rows]
+
+def get_seat_event_bounds():
+    """(oldest, newest) seat event id still in the log; (None, None) when empty."""
+    with get_connection() as conn:
+        return tuple(conn.execute('SELECT MIN(id), MAX(id) FROM seat_events').fetchone())
+
+def _run_write(apply):
+    """Run ``apply(conn)`` in a write transaction and return its result.
+    
+    With the group-commit writer enabled the call is queued and committed
+    together with other pending writes (raises WriteTimeoutError if that
+    takes too long); otherwise it gets its own transaction.
+    """
+    if Config.BOOKING_WRITER_ENABLED:
+        return writer.run(apply, Config.BOOKING_WRITER_TIMEOUT)
+    
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        result = apply(conn)
+        conn.commit()
+    return result
+
+def _apply_booking(conn, show_id, customer_name, customer_email, customer_phone, selected_seats, total_amount,
+                   hold_token, food_order):
     import json
-    booked_seats = []
-    for booking in bookings:
-        if booking[0]:
-            seats = json.loads(booking[0])
-            booked_seats.extend(seats)
+    import time
+    
+    now = time.time()
+    
+    if hold_token:
+        hold = conn.execute('SELECT show_id, seats FROM seat_holds WHERE token = ? AND expires_at > ?',
+                            (hold_token, now)).fetchone()
+        if not hold or hold[0] != show_id:
+            raise ValueError('Seat hold has expired, please select your seats again')
     
-    return booked_seats
+    seat_map, exists = _load_seat_map(conn, show_id)
+    
+    # Seats held by other customers are as good as taken
+    held = seat_map.labels(_held_mask(conn, show_id, now, exclude_token=hold_token) & seat_map.mask(selected_seats))
+    if held:
+        raise SeatConflictError(held)
+    
+    seat_map.book(selected_seats)  # raises SeatConflictError on double booking
+    booked_mask = seat_map.mask(selected_seats)
+    version = _save_seat_map(conn, show_id, seat_map, exists)
+    _log_seat_event(conn, show_id, version, 'booked', booked_mask)
+    
+    if hold_token:
+        conn.execute('DELETE FROM seat_holds WHERE token = ?', (hold_token,))
+        # Held seats left out of the booking go back on sale
+        released = int.from_bytes(hold[1], 'little') & ~booked_mask
+        if released:
+            _log_seat_event(conn, show_id, _save_seat_map(conn, show_id, seat_map, True), 'released', released)
+    _bump_occupancy(conn, show_id, sold=len(selected_seats),
+                    held=-int.from_bytes(hold[1], 'little').bit_count() if hold_token else 0)
+    
+    sql_query = '''INSERT INTO bookings (show_id, customer_name, customer_email, customer_phone, seat_numbers, total_amount)
+                   VALUES (?, ?, ?, ?, ?, ?) RETURNING id, date(booking_date)'''
+    
+    booking_id, day = conn.execute(sql_query, (show_id, customer_name, customer_email, customer_phone,
+                                               json.dumps(selected_seats), total_amount)).fetchone()
+    movie_id, theater_id = conn.execute('SELECT movie_id, theater_id FROM shows WHERE id = ?', (show_id,)).fetchone()
+    conn.execute('''INSERT INTO sales_rollup (day, movie_id, theater_id, bookings, tickets, ticket_revenue)
+                    VALUES (?, ?, ?, 1, ?, ?)
+                    ON CONFLICT (day, movie_id, theater_id) DO UPDATE SET
+                        bookings = bookings + 1, tickets = tickets + excluded.tickets,
+                        ticket_revenue = ticket_revenue + excluded.ticket_revenue''',
+                 (day, movie_id, theater_id, len(selected_seats), total_amount or 0))
+    
+    if food_order:
+        _apply_food_order(conn, booking_id, *food_order)
+    
+    return booking_id, movie_id
+
+def add_booking(show_id, customer_name, customer_email, customer_phone, selected_seats, total_amount,
+                hold_token=None, food_order=None):
+    """Book seats (and optionally attach a food order) in one transaction.
+    
+    ``food_order`` is ``(items, total_amount[, discount_applied])``.
+    Raises SeatConflictError, BookingBusyError, WriteTimeoutError or ValueError.
+    """
+    def apply(conn):
+        return _apply_booking(conn, show_id, customer_name, customer_email, customer_phone,
+                              selected_seats, total_amount, hold_token, food_order)
+    
+    if Config.BOOKING_WRITER_ENABLED:
+        # The writer thread already serializes writes. Holding the show lock
+        # through its linger and commit would allow one booking per show per batch,
+        # so cap the bookings per show in flight instead (bounded wait, raises
+        # BookingBusyError).
+        with show_locks.admit(show_id, Config.BOOKING_WRITER_SHOW_PENDING):
+            booking_id, movie_id = _run_write(apply)
+    else:
+        # Bookings for one show queue on its partition lock (bounded wait, raises
+        # BookingBusyError) before reaching the SQLite write lock
+        with show_locks.lock(show_id):
+            booking_id, movie_id = _run_write(apply)
+    
+    # Cached show listings carry available_seats
+    catalog.invalidate(('shows',), ('shows_by_movie', movie_id))
+    return booking_id
+
+def get_booked_seats(show_id):
+    with get_connection() as conn:
+        seat_map, _ = _load_seat_map(conn, show_id)
+    
+    return seat_map
 
 def get_booking_by_id(booking_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    sql_query = '''SELECT b.id, b.show_id, b.customer_name, b.customer_email, b.customer_phone, b.seat_numbers, b.total_amount, s.show_date, s.show_time, m.title, t.name as theater_name
-                   FROM bookings b
-                   LEFT JOIN shows s ON b.show_id = s.id
-                   LEFT JOIN movies m ON s.movie_id = m.id
-                   LEFT JOIN theaters t ON s.theater_id = t.id
-                   WHERE b.id = ?'''
+        sql_query = '''SELECT b.id, b.show_id, b.customer_name, b.customer_email, b.customer_phone, b.seat_numbers, b.total_amount, s.show_date, s.show_time, m.title, t.name as theater_name
+                       FROM bookings b
+                       LEFT JOIN shows s ON b.show_id = s.id
+                       LEFT JOIN movies m ON s.movie_id = m.id
+                       LEFT JOIN theaters t ON s.theater_id = t.id
+                       WHERE b.id = ?'''
     
-    cursor.execute(sql_query, (booking_id,))
-    booking = cursor.fetchone()
-    conn.close()
+        cursor.execute(sql_query, (booking_id,))
+        booking = cursor.fetchone()
     
     return booking
 def init_food_table():
-    conn = get_connection()
-    cursor = conn.cursor()
+    # Food tables are created by the migrations; kept for older callers
+    return init_database()
+
+def get_bookings_page(show_id=None, movie_id=None, theater_id=None, date_from=None, date_to=None,
+                      customer_email=None, after=None, limit=50):
+    """One page of bookings, newest first, using keyset pagination.
     
-    cursor.execute('''CREATE TABLE IF NOT EXISTS food_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        price REAL NOT NULL,
-        category TEXT NOT NULL
-    )''')
-    
-    cursor.execute('''CREATE TABLE IF NOT EXISTS food_orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        booking_id INTEGER,
-        items TEXT,
-        total_amount REAL,
-        discount_applied REAL DEFAULT 0
-    )''')
-    
-    # Add sample food items
-    cursor.execute('SELECT COUNT(*) FROM food_items')
-    if cursor.fetchone()[0] == 0:
-        food_items = [
-            ('Popcorn (Small)', 150, 'Snacks'),
-            ('Popcorn (Large)', 250, 'Snacks'),
-            ('Nachos', 200, 'Snacks'),
-            ('Hot Dog', 180, 'Snacks'),
-            ('Coke (Small)', 80, 'Drinks'),
-            ('Coke (Large)', 120, 'Drinks'),
-            ('Water Bottle', 50, 'Drinks'),
-            ('Combo 1 (Popcorn + Coke)', 200, 'Combos'),
-            ('Combo 2 (Nachos + Coke)', 250, 'Combos')
-        ]
-        
-        for item in food_items:
-            cursor.execute('INSERT INTO food_items (name, price, category) VALUES (?, ?, ?)', item)
+    ``after`` is the ``(booking_date, id)`` of the last row of the previous
+    page. Returns ``(rows, next_after)``; ``next_after`` is None on the last page.
+    """
+    conditions, params = [], []
+    if show_id is not None:
+        conditions.append('b.show_id = ?')
+        params.append(show_id)
+    if movie_id is not None:
+        conditions.append('s.movie_id = ?')
+        params.append(movie_id)
+    if theater_id is not None:
+        conditions.append('s.theater_id = ?')
+        params.append(theater_id)
+    if date_from:
+        conditions.append('b.booking_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append("b.booking_date < date(?, '+1 day')")
+        params.append(date_to)
+    if customer_email:
+        conditions.append('b.customer_email = ?')
+        params.append(customer_email.strip())
+    if after is not None:
+        conditions.append('(b.booking_date, b.id) < (?, ?)')
+        params.extend(after)
     
-    conn.commit()
-    conn.close()
+    sql_query = '''SELECT b.id, b.show_id, b.customer_name, b.customer_email, b.customer_phone, b.seat_numbers,
+                          b.total_amount, b.booking_date, s.show_date, s.show_time, m.title, t.name as theater_name
+                   FROM bookings b
+                   LEFT JOIN shows s ON b.show_id = s.id
+                   LEFT JOIN movies m ON s.movie_id = m.id
+                   LEFT JOIN theaters t ON s.theater_id = t.id'''
+    if conditions:
+        sql_query += ' WHERE ' + ' AND '.join(conditions)
+    sql_query += ' ORDER BY b.booking_date DESC, b.id DESC LIMIT ?'
+    params.append(limit + 1)
+    
+    with get_connection() as conn:
+        rows = conn.execute(sql_query, params).fetchall()
+    
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1][7], rows[-1][0])
+    return rows, next_after
 
+@catalog.cached(lambda: ('food_items',))
 def get_food_items():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM food_items ORDER BY category, name')
-    items = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM food_items ORDER BY category, name')
+        items = cursor.fetchall()
     return items
 
-def add_food_order(booking_id, items, total_amount, discount_applied=0):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def _apply_food_order(conn, booking_id, items, total_amount, discount_applied=0):
     import json
+    cursor = conn.cursor()
     cursor.execute('INSERT INTO food_orders (booking_id, items, total_amount, discount_applied) VALUES (?, ?, ?, ?)',
                   (booking_id, json.dumps(items), total_amount, discount_applied))
-    
     order_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    # Food revenue lands on the rollup row of the booking it belongs to
+    conn.execute('''INSERT INTO sales_rollup (day, movie_id, theater_id, food_orders, food_revenue)
+                    SELECT date(b.booking_date), s.movie_id, s.theater_id, 1, ? FROM bookings b
+                    JOIN shows s ON s.id = b.show_id WHERE b.id = ?
+                    ON CONFLICT (day, movie_id, theater_id) DO UPDATE SET
+                        food_orders = food_orders + 1, food_revenue = food_revenue + excluded.food_revenue''',
+                 (total_amount or 0, booking_id))
     return order_id
+
+def add_food_order(booking_id, items, total_amount, discount_applied=0):
+    return _run_write(lambda conn: _apply_food_order(conn, booking_id, items, total_amount, discount_applied))
+
+def rebuild_sales_rollup():
+    """Recompute sales_rollup from bookings and food orders; returns the row count."""
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM sales_rollup')
+        cursor = conn.execute('''INSERT INTO sales_rollup
+            (day, movie_id, theater_id, bookings, tickets, ticket_revenue, food_orders, food_revenue)
+            SELECT date(b.booking_date), s.movie_id, s.theater_id, COUNT(*),
+                   COALESCE(SUM(json_array_length(b.seat_numbers)), 0), COALESCE(SUM(b.total_amount), 0),
+                   COALESCE(SUM(f.orders), 0), COALESCE(SUM(f.revenue), 0)
+            FROM bookings b
+            JOIN shows s ON s.id = b.show_id
+            LEFT JOIN (SELECT booking_id, COUNT(*) AS orders, SUM(total_amount) AS revenue
+                       FROM food_orders GROUP BY booking_id) f ON f.booking_id = b.id
+            GROUP BY date(b.booking_date), s.movie_id, s.theater_id''')
+        conn.commit()
+    return cursor.rowcount
+
+# group_by name -> (SQL expression over sales_rollup r, output key)
+SALES_GROUPS = {
+    'day': ('r.day', 'day'),
+    'week': ("date(r.day, '-6 days', 'weekday 1')", 'week'),
+    'month': ('substr(r.day, 1, 7)', 'month'),
+    'movie': ('r.movie_id', 'movie_id'),
+    'theater': ('r.theater_id', 'theater_id'),
+}
+# sort name -> rollup columns summed, largest first
+SALES_SORTS = {'bookings': ('bookings',), 'tickets': ('tickets',), 'revenue': ('ticket_revenue', 'food_revenue')}
+
+def _sales_row(bookings, tickets, ticket_revenue, food_orders, food_revenue):
+    bookings = bookings or 0
+    ticket_revenue = round(ticket_revenue or 0, 2)
+    food_revenue = round(food_revenue or 0, 2)
+    return {
+        'bookings': bookings,
+        'tickets': tickets or 0,
+        'ticket_revenue': ticket_revenue,
+        'food_orders': food_orders or 0,
+        'food_revenue': food_revenue,
+        'revenue': round(ticket_revenue + food_revenue, 2),
+        'avg_basket': round((ticket_revenue + food_revenue) / bookings, 2) if bookings else 0,
+    }
+
+def get_sales_report(date_from=None, date_to=None, group_by=('day',), movie_id=None, theater_id=None,
+                     sort=None, limit=1000):
+    """Sales totals from sales_rollup over an inclusive day range.
+    
+    ``group_by`` is any of SALES_GROUPS; ``sort`` (bookings, tickets or
+    revenue, descending) overrides the default ordering by group. Returns
+    ``(rows, totals)``. Raises ValueError for unknown groups, sorts or dates.
+    """
+    from datetime import date
+    
+    unknown = [name for name in group_by if name not in SALES_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown group_by: {', '.join(unknown)}")
+    if sort and sort not in SALES_SORTS:
+        raise ValueError(f'Unknown sort: {sort}')
+    
+    where = []
+    params = []
+    for column, op, value in (('r.day', '>=', date_from), ('r.day', '<=', date_to)):
+        if value:
+            where.append(f'{column} {op} ?')
+            params.append(date.fromisoformat(value).isoformat())
+    for column, value in (('r.movie_id', movie_id), ('r.theater_id', theater_id)):
+        if value is not None:
+            where.append(f'{column} = ?')
+            params.append(value)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ''
+    measures = ('SUM(r.bookings) AS bookings, SUM(r.tickets) AS tickets, SUM(r.ticket_revenue) AS ticket_revenue, '
+                'SUM(r.food_orders) AS food_orders, SUM(r.food_revenue) AS food_revenue')
+    
+    rows = []
+    sums = [0, 0, 0, 0, 0]
+    with get_connection() as conn:
+        if group_by:
+            groups = [SALES_GROUPS[name] for name in group_by]
+            names = [key for _, key in groups]
+            # Aggregate first, then look up names for the (few) resulting groups
+            extra = ''
+            joins = ''
+            if 'movie' in group_by:
+                extra += ', m.title'
+                joins += ' LEFT JOIN movies m ON m.id = g.movie_id'
+            if 'theater' in group_by:
+                extra += ', t.name'
+                joins += ' LEFT JOIN theaters t ON t.id = g.theater_id'
+            if sort:
+                inner_order = ' + '.join(f'SUM(r.{column})' for column in SALES_SORTS[sort]) + ' DESC'
+                order = ' + '.join(f'g.{column}' for column in SALES_SORTS[sort]) + ' DESC'
+            else:
+                inner_order = ', '.join(expr for expr, _ in groups)
+                order = ', '.join(f'g.{key}' for key in names)
+            sql_query = f'''SELECT {', '.join(f'g.{key}' for key in names)}{extra},
+                                   g.bookings, g.tickets, g.ticket_revenue, g.food_orders, g.food_revenue
+                            FROM (SELECT {', '.join(f'{expr} AS {key}' for expr, key in groups)}, {measures}
+                                  FROM sales_rollup r {where_sql}
+                                  GROUP BY {', '.join(expr for expr, _ in groups)}
+                                  ORDER BY {inner_order} LIMIT ?) g{joins}
+                            ORDER BY {order}'''
+            names += [name for group, name in (('movie', 'movie_title'), ('theater', 'theater_name')) if group in group_by]
+            for row in conn.execute(sql_query, params + [limit]):
+                values = row[len(names):]
+                rows.append({**dict(zip(names, row)), **_sales_row(*values)})
+                sums = [total + (value or 0) for total, value in zip(sums, values)]
+        
+        # Untruncated groups already add up to the totals
+        if not group_by or len(rows) >= limit:
+            sums = conn.execute(f'SELECT {measures} FROM sales_rollup r {where_sql}', params).fetchone()
+    return rows, _sales_row(*sums)
+
 def delete_movie(movie_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('DELETE FROM movies WHERE id = ?', (movie_id,))
-    conn.commit()
-    conn.close()
+        cursor.execute('DELETE FROM movies WHERE id = ?', (movie_id,))
+        conn.commit()
     
+    # Show rows join the movie title, so they go stale too
+    catalog.invalidate(('movies',), ('movie', movie_id), ('movie_choices',),
+                       ('shows',), ('shows_by_movie', movie_id), ('facets',))
     return cursor.rowcount > 0
\ No newline at end of file
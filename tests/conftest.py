@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# The app reads its settings at import time, so point it at a scratch
+# database before any test module imports it
+_db_dir = tempfile.mkdtemp(prefix='movienight-tests-')
+os.environ['SQLITE_PATH'] = os.path.join(_db_dir, 'movienight.db')
+os.environ.setdefault('BOOKING_WRITER_ENABLED', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture(scope='session')
+def db():
+    import simple_sqlite
+    simple_sqlite.init_database()
+    return simple_sqlite
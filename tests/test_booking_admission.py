@@ -0,0 +1,35 @@
+import threading
+import time
+
+import pytest
+
+from booking_locks import BookingBusyError, show_locks
+from config import Config
+
+def test_contended_show_is_busy_on_writer_path(db, monkeypatch):
+    assert Config.BOOKING_WRITER_ENABLED
+    monkeypatch.setattr(Config, 'BOOKING_WRITER_SHOW_PENDING', 1)
+    monkeypatch.setattr(show_locks, 'timeout', 0.2)
+    show_id = db.get_shows()[0][0]
+
+    # Park the writer thread so the first booking stays in flight
+    release = threading.Event()
+    blocker = db.writer.submit(lambda conn: release.wait(10))
+    results = []
+    first = threading.Thread(target=lambda: results.append(
+        db.add_booking(show_id, 'First', 'first@example.com', '', ['A1'], 10)))
+    first.start()
+    deadline = time.time() + 5
+    while not show_locks._pending.get(show_id) and time.time() < deadline:
+        time.sleep(0.01)
+
+    try:
+        with pytest.raises(BookingBusyError):
+            db.add_booking(show_id, 'Second', 'second@example.com', '', ['A2'], 10)
+    finally:
+        release.set()
+    blocker.result(10)
+    first.join(10)
+
+    assert len(results) == 1
+    assert db.add_booking(show_id, 'Third', 'third@example.com', '', ['A3'], 10)
@@ -0,0 +1,33 @@
+import io
+
+import catalog_import
+
+def test_show_available_seats_is_ignored_with_a_warning(db):
+    movie_id = min(db.get_movie_ids())
+    theater_id, capacity = min(db.get_theater_capacities().items())
+    stream = io.StringIO('movie_id,theater_id,show_date,show_time,price,available_seats\n'
+                         f'{movie_id},{theater_id},2031-05-01,10:00,150,7\n'
+                         f'{movie_id},{theater_id},2031-05-01,13:00,150,\n'
+                         f'{movie_id},{theater_id},2031-05-01,16:00,150,abc\n')
+
+    result = catalog_import.import_stream('shows', stream, 'csv')
+
+    assert (result['inserted'], result['failed']) == (3, 0)
+    assert result['warnings'] == [{'line': 2, 'warning': 'available_seats ignored on 2 row(s): '
+                                                          'free seats are counted from the seat map'}]
+    with db.get_connection() as conn:
+        rows = conn.execute('''SELECT s.available_seats, o.capacity - o.sold - o.held FROM shows s
+                               JOIN show_occupancy o ON o.show_id = s.id
+                               WHERE s.movie_id = ? AND s.show_date = '2031-05-01' ''', (movie_id,)).fetchall()
+    assert rows == [(capacity, capacity)] * 3
+
+def test_import_without_ignored_columns_has_no_warnings(db):
+    movie_id = min(db.get_movie_ids())
+    theater_id = min(db.get_theater_capacities())
+    stream = io.StringIO('movie_id,theater_id,show_date,show_time,price\n'
+                         f'{movie_id},{theater_id},2031-05-02,10:00,150\n')
+
+    result = catalog_import.import_stream('shows', stream, 'csv')
+
+    assert result['inserted'] == 1
+    assert result['warnings'] == []
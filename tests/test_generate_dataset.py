@@ -0,0 +1,38 @@
+import sqlite3
+
+import generate_dataset
+
+def _table_counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('movies', 'theaters', 'shows', 'bookings')}
+    finally:
+        conn.close()
+
+def test_row_counts_match_requested_sizes(tmp_path):
+    sizes = generate_dataset.SCALES['tiny']
+    path = str(tmp_path / 'tiny.db')
+    result = generate_dataset.generate(path, **sizes)
+
+    assert _table_counts(path) == sizes
+    assert {name: result['counts'][name] for name in sizes} == sizes
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM food_items').fetchone()[0] > 0
+    finally:
+        conn.close()
+
+def test_same_inputs_give_same_database(tmp_path):
+    sizes = {'movies': 5, 'theaters': 2, 'shows': 40, 'bookings': 100}
+    dumps = []
+    for name in ('a.db', 'b.db'):
+        path = str(tmp_path / name)
+        generate_dataset.generate(path, **sizes)
+        conn = sqlite3.connect(path)
+        dumps.append([(table, conn.execute(f'SELECT * FROM {table} ORDER BY 1').fetchall())
+                      for table in ('movies', 'theaters', 'shows', 'bookings')])
+        conn.close()
+
+    assert dumps[0] == dumps[1]
+    assert dumps[0][2][1][0][3] == generate_dataset.DEFAULT_START_DATE.isoformat()